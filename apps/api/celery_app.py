@@ -1,12 +1,25 @@
 from celery import Celery
-from celery.signals import task_postrun, task_failure, task_success, task_retry
+from celery.signals import task_postrun, task_failure, task_success, task_retry, worker_process_init
 from apps.api.config import settings
 import logging
 import asyncio
 import gc
+import os
+from typing import Optional
+
+# uvloop为可选依赖，未安装时使用标准事件循环
+try:
+    import uvloop
+    HAS_UVLOOP = True
+except ImportError:
+    HAS_UVLOOP = False
 
 logger = logging.getLogger(__name__)
 
+# 每个worker进程复用的事件循环
+_worker_loop: Optional[asyncio.AbstractEventLoop] = None
+_worker_loop_pid: Optional[int] = None
+
 celery_app = Celery(
     "ppt_assistant",
     broker=settings.CELERY_BROKER_URL,
@@ -61,6 +74,31 @@ celery_app.conf.update(
     }
 )
 
+def get_worker_loop() -> asyncio.AbstractEventLoop:
+    """获取当前worker进程复用的事件循环，不存在或已关闭时创建
+    
+    fork出的子进程不会复用父进程的事件循环。
+    """
+    global _worker_loop, _worker_loop_pid
+    if _worker_loop is None or _worker_loop.is_closed() or _worker_loop_pid != os.getpid():
+        _worker_loop = uvloop.new_event_loop() if HAS_UVLOOP else asyncio.new_event_loop()
+        _worker_loop_pid = os.getpid()
+        asyncio.set_event_loop(_worker_loop)
+        logger.info(f"已创建worker事件循环: pid={_worker_loop_pid}, uvloop={HAS_UVLOOP}")
+    return _worker_loop
+
+
+def run_in_worker_loop(coro):
+    """在worker进程复用的事件循环上运行协程，替代每个任务一次的asyncio.run"""
+    return get_worker_loop().run_until_complete(coro)
+
+
+@worker_process_init.connect
+def worker_process_init_handler(**kwargs):
+    """worker子进程启动时创建事件循环"""
+    get_worker_loop()
+
+
 def cleanup_async_resources():
     """
     清理异步资源，特别是AsyncOpenAI客户端
@@ -3,14 +3,14 @@ from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
 from apps.api.models import get_db
 from apps.api.models.database import GenerationTask, Template
-from apps.api.services.file_service import FileService
+from apps.api.services.file_service import get_file_service
 import os
 import logging
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/files")
-file_service = FileService()
+file_service = get_file_service()
 
 @router.get("/ppt/{task_id}/download")
 async def download_ppt(task_id: str, db: Session = Depends(get_db)):
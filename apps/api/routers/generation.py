@@ -4,7 +4,7 @@ from sqlalchemy.orm import Session
 from apps.api.models import get_db
 from apps.api.models.database import GenerationTask, Template
 from apps.api.dependencies.auth import get_current_active_user
-from apps.api.services.redis_service import RedisService
+from apps.api.services.redis_service import get_redis_service
 from apps.api.tasks.ppt_generation import generate_ppt_task
 from typing import Optional, Dict, Any, List
 from pydantic import BaseModel
@@ -12,7 +12,7 @@ import uuid
 from datetime import datetime
 
 router = APIRouter(prefix="/ppt")
-redis_service = RedisService()
+redis_service = get_redis_service()
 
 # DeepThink模型配置
 class DeepThinkConfig(BaseModel):
@@ -4,8 +4,8 @@ from sqlalchemy.orm import Session
 from apps.api.models import get_db
 from apps.api.models.database import Template, User
 from apps.api.dependencies.auth import get_current_active_user
-from apps.api.services.redis_service import RedisService
-from apps.api.services.file_service import FileService
+from apps.api.services.redis_service import get_redis_service
+from apps.api.services.file_service import get_file_service
 from apps.api.tasks.template_analysis import analyze_template_task
 from typing import Optional, List, Dict, Any
 from pydantic import BaseModel
@@ -19,8 +19,8 @@ router = APIRouter(
     tags=["templates"]
 )
 
-redis_service = RedisService()
-file_service = FileService()
+redis_service = get_redis_service()
+file_service = get_file_service()
 
 logger = logging.getLogger(__name__)
 
@@ -5,7 +5,7 @@ from pathlib import Path
 from typing import Optional, Dict
 from fastapi import UploadFile
 from apps.api.config import settings
-from core.engine.cache_manager import CacheManager
+from core.engine.cache_manager import get_cache_manager
 
 class FileService:
     """文件管理服务，处理模板文件和生成的PPT文件"""
@@ -16,7 +16,7 @@ class FileService:
         self.cache_dir = settings.CACHE_DIR
         self.ppt_analysis_dir = self.cache_dir / "ppt_analysis"
         self.output_dir = settings.OUTPUT_DIR
-        self.cache_manager = CacheManager()
+        self.cache_manager = get_cache_manager()
         
         # 确保目录存在
         for dir_path in [self.upload_dir, self.ppt_analysis_dir, self.output_dir]:
@@ -140,4 +140,16 @@ class FileService:
         
         # 按照幻灯片索引排序
         preview_images.sort(key=lambda x: int(x.split("slide_")[1].split(".")[0]))
-        return preview_images 
\ No newline at end of file
+        return preview_images
+
+
+# 进程内共享的FileService
+_shared_file_service: Optional[FileService] = None
+
+
+def get_file_service() -> FileService:
+    """获取进程内共享的FileService，首次调用时创建"""
+    global _shared_file_service
+    if _shared_file_service is None:
+        _shared_file_service = FileService()
+    return _shared_file_service
@@ -1,33 +1,206 @@
 import redis
+from redis import asyncio as aioredis
+import asyncio
 import json
-from typing import Dict, Any, Optional
+import logging
+import time
+from typing import Dict, Any, Optional, Tuple, Union
 from datetime import datetime, timedelta
 from apps.api.config import settings
 
+logger = logging.getLogger(__name__)
+
+# orjson为可选依赖，安装后用于任务状态的序列化和解析
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# 任务状态的过期时间（秒）：进行中的任务每次更新时续期，终态任务只保留较短时间
+TASK_STATUS_TTL = int(timedelta(hours=24).total_seconds())
+TERMINAL_TASK_STATUS_TTL = int(timedelta(hours=1).total_seconds())
+TERMINAL_TASK_STATUSES = frozenset({"completed", "failed"})
+
+# 任务状态中时间字段的格式：UTC时间，ISO 8601，精确到秒，无时区后缀（datetime.fromisoformat可直接解析）
+TASK_TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def utc_timestamp() -> str:
+    """返回当前UTC时间的任务状态时间字符串，不构造datetime对象"""
+    return time.strftime(TASK_TIMESTAMP_FORMAT, time.gmtime())
+
+
+def _status_ttl(status: Optional[str]) -> int:
+    """根据任务状态返回Redis键的过期时间"""
+    return TERMINAL_TASK_STATUS_TTL if status in TERMINAL_TASK_STATUSES else TASK_STATUS_TTL
+
+
+def _dumps(data: Any) -> Union[str, bytes]:
+    """序列化为JSON，安装orjson时返回bytes（Redis客户端可直接写入）"""
+    if HAS_ORJSON:
+        return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data)
+
+
+def _loads(data: Union[str, bytes]) -> Any:
+    """解析Redis中的JSON数据"""
+    return orjson.loads(data) if HAS_ORJSON else json.loads(data)
+
+
+def _serialize_status_update(data: Union[Dict[str, Any], str, bytes],
+                             message: Union[Dict[str, Any], str, bytes, None]) -> Tuple[Union[str, bytes], int, Union[str, bytes]]:
+    """序列化状态写入和发布消息，返回(状态JSON, 过期时间, 消息JSON)"""
+    if isinstance(data, (str, bytes)):
+        payload, ttl = data, TASK_STATUS_TTL
+    else:
+        payload, ttl = _dumps(data), _status_ttl(data.get("status"))
+    if message is None:
+        message = payload
+    elif not isinstance(message, (str, bytes)):
+        message = _dumps(message)
+    return payload, ttl, message
+
+
+def _close_async_client(client, loop: asyncio.AbstractEventLoop) -> None:
+    """在旧异步客户端所属的事件循环上关闭它，释放连接池中的连接
+    
+    关闭操作交给该循环执行（空闲的循环在下次运行时执行）；已关闭的循环无法再执行异步关闭。
+    """
+    if loop.is_closed():
+        logger.warning("异步Redis客户端所属的事件循环已关闭，无法关闭其连接")
+        return
+    asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+
+
 class RedisService:
     """Redis服务类，用于任务状态管理和WebSocket通信"""
     
     def __init__(self):
         self.redis_client = redis.from_url(settings.REDIS_URL)
         self.pubsub = self.redis_client.pubsub()
+        # 异步客户端的连接池绑定在创建它的事件循环上，首次在事件循环内使用时创建
+        self._async_client = None
+        self._async_loop = None
+        # 订阅专用的异步客户端：每个订阅在整个监听期间占用一个连接，与命令连接池分开且不设上限，
+        # 监听的任务再多也不会占满命令连接池
+        self._pubsub_client = None
+        self._pubsub_loop = None
     
-    def update_task_status(self, task_id: str, **kwargs):
+    @property
+    def async_client(self):
+        """获取当前事件循环上的异步Redis客户端（必须在事件循环内调用）"""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            if self._async_client is not None:
+                _close_async_client(self._async_client, self._async_loop)
+            self._async_client = aioredis.from_url(settings.REDIS_URL, max_connections=50)
+            self._async_loop = loop
+        return self._async_client
+    
+    @property
+    def pubsub_client(self):
+        """获取当前事件循环上订阅专用的异步Redis客户端（必须在事件循环内调用）"""
+        loop = asyncio.get_running_loop()
+        if self._pubsub_client is None or self._pubsub_loop is not loop:
+            if self._pubsub_client is not None:
+                _close_async_client(self._pubsub_client, self._pubsub_loop)
+            self._pubsub_client = aioredis.from_url(settings.REDIS_URL)
+            self._pubsub_loop = loop
+        return self._pubsub_client
+    
+    def update_task_status(self, task_id: str, **kwargs) -> Dict[str, Any]:
         """更新任务状态
         
         Args:
             task_id: 任务ID
             **kwargs: 状态数据，如status, progress, current_step等
+            
+        Returns:
+            合并后的完整任务状态
+        """
+        current_data = self.get_task_status(task_id) or {}
+        current_data.update(kwargs)
+        current_data["updated_at"] = utc_timestamp()
+        
+        self.set_task_status_payload(task_id, _dumps(current_data), _status_ttl(current_data.get("status")))
+        return current_data
+    
+    def set_task_status_payload(self, task_id: str, payload: Union[str, bytes], ttl: int = TASK_STATUS_TTL):
+        """直接写入已序列化的任务状态，不做读取合并
+        
+        Args:
+            task_id: 任务ID
+            payload: 已序列化的完整任务状态JSON
+            ttl: 过期时间（秒），默认按进行中的任务处理
         """
         key = f"task:{task_id}:status"
+        self.redis_client.setex(key, ttl, payload)
+    
+    def pipeline_update_status(self, task_id: str, data: Union[Dict[str, Any], str, bytes],
+                               message: Union[Dict[str, Any], str, bytes, None] = None):
+        """在一次往返中写入任务状态并发布更新消息
+        
+        Args:
+            task_id: 任务ID
+            data: 完整任务状态，可以是字典或已序列化的JSON（字符串按进行中的任务设置过期时间）
+            message: 发布到WebSocket频道的消息，默认与data相同
+        """
+        payload, ttl, message = _serialize_status_update(data, message)
+        with self.redis_client.pipeline(transaction=False) as pipe:
+            pipe.setex(f"task:{task_id}:status", ttl, payload)
+            pipe.publish(f"task_updates:{task_id}", message)
+            pipe.execute()
+    
+    def update_and_publish(self, task_id: str, **kwargs) -> Dict[str, Any]:
+        """更新任务状态并发布 {"task_id", **kwargs} 更新消息，写入和发布合并为一次往返
+        
+        Args:
+            task_id: 任务ID
+            **kwargs: 状态数据
+            
+        Returns:
+            合并后的完整任务状态
+        """
         current_data = self.get_task_status(task_id) or {}
         current_data.update(kwargs)
-        current_data["updated_at"] = datetime.utcnow().isoformat()
+        current_data["updated_at"] = utc_timestamp()
         
-        self.redis_client.setex(
-            key, 
-            int(timedelta(hours=24).total_seconds()),  # 24小时过期，转换为整数
-            json.dumps(current_data)
-        )
+        # kwargs是本次调用新建的字典，直接补上task_id作为发布消息，不再复制一份
+        kwargs["task_id"] = task_id
+        self.pipeline_update_status(task_id, current_data, kwargs)
+        return current_data
+    
+    async def amerge_task_status(self, task_id: str, **kwargs) -> Dict[str, Any]:
+        """异步读取任务状态并与新数据合并，不写回Redis
+        
+        Args:
+            task_id: 任务ID
+            **kwargs: 状态数据
+            
+        Returns:
+            合并后的完整任务状态
+        """
+        data = await self.async_client.get(f"task:{task_id}:status")
+        current_data = _loads(data) if data else {}
+        current_data.update(kwargs)
+        current_data["updated_at"] = utc_timestamp()
+        return current_data
+    
+    async def apipeline_update_status(self, task_id: str, data: Union[Dict[str, Any], str, bytes],
+                                      message: Union[Dict[str, Any], str, bytes, None] = None):
+        """在一次往返中写入任务状态并发布更新消息
+        
+        Args:
+            task_id: 任务ID
+            data: 完整任务状态，可以是字典或已序列化的JSON（字符串按进行中的任务设置过期时间）
+            message: 发布到WebSocket频道的消息，默认与data相同
+        """
+        payload, ttl, message = _serialize_status_update(data, message)
+        async with self.async_client.pipeline(transaction=False) as pipe:
+            pipe.setex(f"task:{task_id}:status", ttl, payload)
+            pipe.publish(f"task_updates:{task_id}", message)
+            await pipe.execute()
     
     def get_task_status(self, task_id: str) -> Optional[Dict[str, Any]]:
         """获取任务状态
@@ -40,17 +213,18 @@ class RedisService:
         """
         key = f"task:{task_id}:status"
         data = self.redis_client.get(key)
-        return json.loads(data) if data else None
+        return _loads(data) if data else None
     
-    def publish_task_update(self, task_id: str, data: Dict[str, Any]):
+    def publish_task_update(self, task_id: str, data: Union[Dict[str, Any], str, bytes]):
         """发布任务更新消息
         
         Args:
             task_id: 任务ID
-            data: 更新数据
+            data: 更新数据，可以是字典或已序列化的JSON
         """
         channel = f"task_updates:{task_id}"
-        self.redis_client.publish(channel, json.dumps(data))
+        message = data if isinstance(data, (str, bytes)) else _dumps(data)
+        self.redis_client.publish(channel, message)
     
     def subscribe_task_updates(self, task_id: str):
         """订阅任务更新
@@ -65,6 +239,23 @@ class RedisService:
         self.pubsub.subscribe(channel)
         return self.pubsub
     
+    async def asubscribe_task_updates(self, task_id: str):
+        """异步订阅任务更新频道
+        
+        每次调用返回一个独立的、已订阅 task_updates:{task_id} 的异步PubSub对象，
+        订阅方通过 `async for message in pubsub.listen()` 等待消息，无需轮询。
+        订阅连接来自订阅专用的客户端，不占用命令连接池。
+        
+        Args:
+            task_id: 任务ID
+            
+        Returns:
+            redis.asyncio PubSub对象，使用完毕后需调用reset()释放连接
+        """
+        pubsub = self.pubsub_client.pubsub()
+        await pubsub.subscribe(f"task_updates:{task_id}")
+        return pubsub
+    
     def cache_template_list(self, templates: list, status_filter: str = "ready", expire_seconds: int = 300):
         """缓存模板列表
         
@@ -175,7 +366,8 @@ class RedisService:
             task_id: 任务ID
         """
         key = f"template:{template_id}:analysis_task"
-        self.redis_client.set(key, task_id)
+        # 与任务状态同样的过期时间，避免异常退出的分析任务留下永久关联
+        self.redis_client.setex(key, TASK_STATUS_TTL, task_id)
     
     def clear_template_analysis_task_id(self, template_id: int):
         """清理模板分析任务ID关联
@@ -184,4 +376,16 @@ class RedisService:
             template_id: 模板ID
         """
         key = f"template:{template_id}:analysis_task"
-        self.redis_client.delete(key) 
\ No newline at end of file
+        self.redis_client.delete(key)
+
+
+# 进程内共享的RedisService，各模块通过get_redis_service获取，同一进程只建立一套连接池
+_shared_redis_service: Optional[RedisService] = None
+
+
+def get_redis_service() -> RedisService:
+    """获取进程内共享的RedisService，首次调用时创建"""
+    global _shared_redis_service
+    if _shared_redis_service is None:
+        _shared_redis_service = RedisService()
+    return _shared_redis_service
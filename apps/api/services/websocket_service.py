@@ -3,7 +3,7 @@ from typing import Dict, List
 import json
 import asyncio
 import logging
-from apps.api.services.redis_service import RedisService
+from apps.api.services.redis_service import get_redis_service
 
 logger = logging.getLogger(__name__)
 
@@ -12,7 +12,7 @@ class WebSocketManager:
     
     def __init__(self):
         self.active_connections: Dict[str, List[WebSocket]] = {}
-        self.redis_service = RedisService()
+        self.redis_service = get_redis_service()
         self.task_listeners: Dict[str, asyncio.Task] = {}
         logger.info("WebSocket管理器初始化完成")
     
@@ -101,27 +101,21 @@ class WebSocketManager:
         Args:
             task_id: 任务ID
         """
-        pubsub = self.redis_service.subscribe_task_updates(task_id)
+        pubsub = await self.redis_service.asubscribe_task_updates(task_id)
         logger.info(f"已订阅Redis任务更新: task_id={task_id}")
         
         try:
-            # 创建轮询循环，避免阻塞事件循环
-            while True:
-                # 非阻塞方式获取消息
-                message = pubsub.get_message(timeout=0.01)
-                if message:
-                    logger.debug(f"收到Redis消息: task_id={task_id}, type={message.get('type')}")
-                    
-                    if message['type'] == 'message':
-                        try:
-                            data = json.loads(message['data'])
-                            logger.info(f"收到任务更新: task_id={task_id}, status={data.get('status', 'unknown')}, progress={data.get('progress', 'unknown')}")
-                            await self.send_task_update(task_id, data)
-                        except Exception as e:
-                            logger.error(f"处理消息时出错: task_id={task_id}, error={str(e)}")
+            # 阻塞等待推送的消息，不再定时轮询
+            async for message in pubsub.listen():
+                logger.debug(f"收到Redis消息: task_id={task_id}, type={message.get('type')}")
                 
-                # 短暂等待避免CPU过度占用
-                await asyncio.sleep(0.1)
+                if message['type'] == 'message':
+                    try:
+                        data = json.loads(message['data'])
+                        logger.info(f"收到任务更新: task_id={task_id}, status={data.get('status', 'unknown')}, progress={data.get('progress', 'unknown')}")
+                        await self.send_task_update(task_id, data)
+                    except Exception as e:
+                        logger.error(f"处理消息时出错: task_id={task_id}, error={str(e)}")
                 
                 # 如果没有连接，停止监听
                 if task_id not in self.active_connections or not self.active_connections[task_id]:
@@ -132,7 +126,9 @@ class WebSocketManager:
         except Exception as e:
             logger.error(f"Redis订阅出错: task_id={task_id}, error={str(e)}")
         finally:
-            pubsub.unsubscribe()
+            # 每个任务独立的订阅，只释放本任务的频道
+            await pubsub.unsubscribe()
+            await pubsub.reset()
             logger.info(f"已取消Redis订阅: task_id={task_id}")
 
 # 全局WebSocket管理器实例
@@ -1,21 +1,61 @@
 from celery import current_task
-from apps.api.celery_app import celery_app
-from apps.api.services.redis_service import RedisService
+from celery.signals import worker_process_init
+from apps.api.celery_app import celery_app, run_in_worker_loop
+from apps.api.services.redis_service import RedisService, get_redis_service, utc_timestamp, _dumps
 from core.engine.workflowEngine import WorkflowEngine
-from apps.api.services.file_service import FileService
+from core.utils.ppt_agent_helper import PPTAgentHelper
+from apps.api.services.file_service import get_file_service
 from apps.api.models import SessionLocal, GenerationTask
 import asyncio
-import json
 from datetime import datetime
 from pathlib import Path
 import uuid
 import os
+import shutil
 import logging
 from typing import Dict, Any, Optional, List
 
 
 logger = logging.getLogger(__name__)
 
+# 纯进度更新（同一步骤内只有进度变化）所包含的字段
+_PROGRESS_ONLY_KEYS = frozenset({"status", "progress", "current_step", "step_description", "updated_at"})
+
+
+# 各错误码对应的固定错误字段，只有error_message随错误变化
+_ERROR_TEMPLATES = {
+    code: {"has_error": True, "error_code": code, "can_retry": True}
+    for code in ("WORKFLOW_ERROR", "WORKFLOW_EXECUTION_ERROR", "FILE_GENERATION_ERROR", "GENERATION_ERROR")
+}
+
+
+def _build_error(error_code: str, error_message: str) -> Dict[str, Any]:
+    """根据错误码模板构建错误信息"""
+    return {**_ERROR_TEMPLATES[error_code], "error_message": error_message}
+
+
+@worker_process_init.connect
+def _init_worker_process(**kwargs):
+    """worker子进程启动时创建进程共享的服务实例，第一个任务无需再建立连接池"""
+    get_redis_service()
+    get_file_service()
+
+
+def _build_payload_template(data: Dict[str, Any]) -> str:
+    """将不含progress和updated_at的状态序列化为去掉结尾大括号的JSON片段
+    
+    与其他状态写入使用同一个序列化函数，同一个键的内容不会因写入路径不同而换用不同的编码器。
+    """
+    payload = _dumps(data)
+    if isinstance(payload, bytes):
+        payload = payload.decode("utf-8")
+    return payload[:-1]
+
+
+def _splice_progress(template: str, progress: int, updated_at: str) -> str:
+    """把进度和更新时间拼接到预序列化的JSON片段中，得到完整JSON"""
+    return f'{template},"progress":{int(progress)},"updated_at":"{updated_at}"}}'
+
 
 class TaskStatusManager:
     """任务状态管理器 - 统一处理Redis和数据库的数据同步"""
@@ -23,18 +63,121 @@ class TaskStatusManager:
     def __init__(self, task_id: str, redis_service: RedisService):
         self.task_id = task_id
         self.redis_service = redis_service
+        # 最近一次写入数据库的步骤，用于判断进度更新是否跨越步骤
+        self.last_persisted_step: Optional[str] = None
+        # 同一步骤内的连续进度更新只有progress不同，缓存其余部分的序列化结果
+        self._state_step_key: Optional[tuple] = None
+        self._state_template: Optional[str] = None
+        self._publish_template: Optional[str] = None
+        # 保证异步更新按回调顺序写入Redis
+        self._async_lock: Optional[asyncio.Lock] = None
+        # 本任务在Redis中的完整状态；首次更新时读取一次，之后在本地合并，每次更新只有一次往返
+        self._state: Optional[Dict[str, Any]] = None
+        
+    def update_status(self, status_data: Dict[str, Any], persist: bool = False) -> None:
+        """更新任务状态
         
-    def update_status(self, status_data: Dict[str, Any]) -> None:
-        """同时更新Redis和数据库中的任务状态"""
+        Redis和WebSocket每次都会更新；数据库只记录里程碑（步骤切换和终态），
+        同一步骤内的进度变化不写入数据库。
+        
+        Args:
+            status_data: 状态数据
+            persist: 是否同时写入数据库
+        """
         # 更新数据库状态
-        self._update_database_status(status_data)
+        if persist:
+            self._update_database_status(status_data)
+            self.last_persisted_step = status_data.get("current_step", self.last_persisted_step)
+        
+        is_progress_only = status_data.keys() == _PROGRESS_ONLY_KEYS
+        step_key = (status_data.get("status"), status_data.get("current_step"), status_data.get("step_description"))
         
-        # 更新Redis状态
-        self.redis_service.update_task_status(self.task_id, **status_data)
+        if is_progress_only and step_key == self._state_step_key:
+            # 同一步骤内仅进度变化，复用缓存的序列化结果
+            progress, updated_at = self._merge_progress(status_data)
+            self.redis_service.pipeline_update_status(
+                self.task_id,
+                _splice_progress(self._state_template, progress, updated_at),
+                _splice_progress(self._publish_template, progress, updated_at)
+            )
+            return
         
-        # 发送WebSocket通知
+        # 更新Redis状态并发送WebSocket通知
         websocket_data = {"task_id": self.task_id, **status_data}
-        self.redis_service.publish_task_update(self.task_id, websocket_data)
+        if self._state is None:
+            state = self._state = self.redis_service.update_and_publish(self.task_id, **status_data)
+        else:
+            state = self._merge_state(status_data)
+            self.redis_service.pipeline_update_status(self.task_id, state, websocket_data)
+        
+        self._remember_step(is_progress_only, step_key, state, websocket_data)
+    
+    async def aupdate_status(self, status_data: Dict[str, Any], persist: bool = False) -> None:
+        """异步更新任务状态，供工作流事件循环内的进度回调使用
+        
+        Redis写入和WebSocket发布通过一次pipeline完成；数据库写入放到线程中执行，
+        不阻塞事件循环。
+        
+        Args:
+            status_data: 状态数据
+            persist: 是否同时写入数据库
+        """
+        if self._async_lock is None:
+            self._async_lock = asyncio.Lock()
+        
+        async with self._async_lock:
+            if persist:
+                # 先记录步骤，避免同一步骤的后续回调在数据库写入期间重复持久化
+                self.last_persisted_step = status_data.get("current_step", self.last_persisted_step)
+                await asyncio.to_thread(self._update_database_status, status_data)
+            
+            is_progress_only = status_data.keys() == _PROGRESS_ONLY_KEYS
+            step_key = (status_data.get("status"), status_data.get("current_step"), status_data.get("step_description"))
+            
+            if is_progress_only and step_key == self._state_step_key:
+                progress, updated_at = self._merge_progress(status_data)
+                await self.redis_service.apipeline_update_status(
+                    self.task_id,
+                    _splice_progress(self._state_template, progress, updated_at),
+                    _splice_progress(self._publish_template, progress, updated_at)
+                )
+                return
+            
+            if self._state is None:
+                state = self._state = await self.redis_service.amerge_task_status(self.task_id, **status_data)
+            else:
+                state = self._merge_state(status_data)
+            websocket_data = {"task_id": self.task_id, **status_data}
+            await self.redis_service.apipeline_update_status(self.task_id, state, websocket_data)
+            
+            self._remember_step(is_progress_only, step_key, state, websocket_data)
+    
+    def _merge_state(self, status_data: Dict[str, Any]) -> Dict[str, Any]:
+        """将状态数据合并到本地缓存的完整状态"""
+        self._state.update(status_data)
+        self._state["updated_at"] = utc_timestamp()
+        return self._state
+    
+    def _merge_progress(self, status_data: Dict[str, Any]) -> tuple:
+        """纯进度更新只需同步本地状态中的进度和更新时间，返回(progress, updated_at)"""
+        progress, updated_at = status_data["progress"], status_data["updated_at"]
+        self._state["progress"] = progress
+        self._state["updated_at"] = updated_at
+        return progress, updated_at
+    
+    def _remember_step(self, is_progress_only: bool, step_key: tuple,
+                       state: Dict[str, Any], websocket_data: Dict[str, Any]) -> None:
+        """缓存本步骤的序列化结果，供后续纯进度更新使用"""
+        if is_progress_only:
+            self._state_step_key = step_key
+            self._state_template = _build_payload_template(
+                {k: v for k, v in state.items() if k not in ("progress", "updated_at")}
+            )
+            self._publish_template = _build_payload_template(
+                {k: v for k, v in websocket_data.items() if k not in ("progress", "updated_at")}
+            )
+        else:
+            self._state_step_key = None
         
     def _update_database_status(self, status_data: Dict[str, Any]) -> None:
         """更新数据库中的任务状态"""
@@ -77,42 +220,56 @@ class TaskStatusManager:
 
 
 def _create_progress_callback(task_id: str, status_manager: TaskStatusManager):
-    """创建进度回调函数"""
-    def progress_callback(step: str, progress: int, description: str, preview_data: dict = None):
-        # 构建基础进度数据
-        update_data = {
+    """创建进度回调函数
+    
+    按回调场景（普通进度、错误、带预览数据）预先构建各自的状态数据构造函数，
+    每次回调只走一个分支，避免逐字段的条件判断和字典合并。
+    """
+    def _emit_normal(step: str, progress: int, description: str, preview_data: dict) -> Dict[str, Any]:
+        return {
             "status": "processing",
             "progress": progress,
             "current_step": step,
             "step_description": description,
-            "updated_at": datetime.utcnow().isoformat()
+            "updated_at": utc_timestamp()
         }
+    
+    def _emit_error(step: str, progress: int, description: str, preview_data: dict) -> Dict[str, Any]:
+        return {
+            "status": "failed",
+            "progress": max(0, progress),
+            "current_step": step,
+            "step_description": description,
+            "updated_at": utc_timestamp(),
+            "error": _build_error("WORKFLOW_ERROR", description)
+        }
+    
+    def _emit_preview(step: str, progress: int, description: str, preview_data: dict) -> Dict[str, Any]:
+        update_data = _emit_normal(step, progress, description, preview_data)
+        if "preview_url" in preview_data:
+            update_data["preview_url"] = preview_data["preview_url"]
+        if "preview_images" in preview_data:
+            update_data["preview_images"] = preview_data["preview_images"]
+        return update_data
+    
+    async def progress_callback(step: str, progress: int, description: str, preview_data: dict = None):
+        # 构建进度数据
+        if not preview_data:
+            emit = _emit_normal
+        elif preview_data.get("error"):
+            emit = _emit_error
+        else:
+            emit = _emit_preview
+        update_data = emit(step, progress, description, preview_data)
         
-        # 检查是否为错误状态
-        if preview_data and preview_data.get("error"):
-            update_data.update({
-                "status": "failed",
-                "progress": max(0, progress),
-                "error": {
-                    "has_error": True,
-                    "error_code": "WORKFLOW_ERROR",
-                    "error_message": description,
-                    "can_retry": True
-                }
-            })
-        
-        # 添加预览数据
-        if preview_data and not preview_data.get("error"):
-            if "preview_url" in preview_data:
-                update_data["preview_url"] = preview_data["preview_url"]
-            if "preview_images" in preview_data:
-                update_data["preview_images"] = preview_data["preview_images"]
+        # 仅在步骤切换或进入终态时写入数据库
+        persist = step != status_manager.last_persisted_step or emit is _emit_error
         
-        # 统一更新状态
-        status_manager.update_status(update_data)
+        # 统一更新状态（在工作流事件循环上异步写入Redis）
+        await status_manager.aupdate_status(update_data, persist=persist)
         
         # 记录日志
-        log_level = logging.ERROR if update_data["status"] == "failed" else logging.INFO
+        log_level = logging.ERROR if emit is _emit_error else logging.INFO
         logger.log(log_level, f"任务进度更新: task_id={task_id}, step={step}, progress={progress}%, description={description}")
     
     return progress_callback
@@ -120,23 +277,24 @@ def _create_progress_callback(task_id: str, status_manager: TaskStatusManager):
 
 def _initialize_task(task_id: str, status_manager: TaskStatusManager) -> None:
     """初始化任务状态"""
+    now = utc_timestamp()
     initial_status = {
         "status": "processing",
         "progress": 0,
         "current_step": "initialization",
         "step_description": "初始化PPT生成任务",
-        "created_at": datetime.utcnow().isoformat(),
-        "updated_at": datetime.utcnow().isoformat(),
-        "started_at": datetime.utcnow().isoformat()
+        "created_at": now,
+        "updated_at": now,
+        "started_at": now
     }
     
-    status_manager.update_status(initial_status)
+    status_manager.update_status(initial_status, persist=True)
     logger.info(f"任务初始化完成: task_id={task_id}")
 
 
 def _validate_template_and_create_dirs(task_data: Dict[str, Any], task_id: str) -> tuple[str, str]:
     """验证模板并创建目录"""
-    file_service = FileService()
+    file_service = get_file_service()
     
     # 获取模板路径
     template_path = file_service.get_template_file_path(task_data["template_id"])
@@ -184,7 +342,7 @@ def _execute_workflow(engine: WorkflowEngine, task_id: str, task_data: Dict[str,
         }
         logger.info(f"使用用户自定义deepthink配置: {deepthink_config['model_name']}")
     
-    return asyncio.run(engine.run_async(**workflow_params))
+    return run_in_worker_loop(engine.run_async(**workflow_params))
 
 
 def _handle_workflow_failure(result: Any, task_id: str, status_manager: TaskStatusManager) -> None:
@@ -195,22 +353,18 @@ def _handle_workflow_failure(result: Any, task_id: str, status_manager: TaskStat
     last_failure = result.failures[-1] if result.failures else "工作流执行失败"
     logger.error(f"工作流执行失败: task_id={task_id}, error={last_failure}")
     
+    now = utc_timestamp()
     error_data = {
         "status": "failed",
         "current_step": "workflow_error",
         "step_description": f"工作流执行失败: {last_failure}",
         "progress": 0,
-        "updated_at": datetime.utcnow().isoformat(),
-        "completed_at": datetime.utcnow().isoformat(),
-        "error": {
-            "has_error": True,
-            "error_code": "WORKFLOW_EXECUTION_ERROR", 
-            "error_message": last_failure,
-            "can_retry": True
-        }
+        "updated_at": now,
+        "completed_at": now,
+        "error": _build_error("WORKFLOW_EXECUTION_ERROR", last_failure)
     }
     
-    status_manager.update_status(error_data)
+    status_manager.update_status(error_data, persist=True)
     raise Exception(last_failure)
 
 
@@ -220,22 +374,18 @@ def _validate_output_file(result: Any, task_id: str, status_manager: TaskStatusM
         error_msg = "PPT文件生成失败，输出文件不存在"
         logger.error(f"{error_msg}: task_id={task_id}")
         
+        now = utc_timestamp()
         error_data = {
             "status": "failed",
             "current_step": "file_generation_error",
             "step_description": error_msg,
             "progress": 0,
-            "updated_at": datetime.utcnow().isoformat(),
-            "completed_at": datetime.utcnow().isoformat(),
-            "error": {
-                "has_error": True,
-                "error_code": "FILE_GENERATION_ERROR",
-                "error_message": error_msg,
-                "can_retry": True
-            }
+            "updated_at": now,
+            "completed_at": now,
+            "error": _build_error("FILE_GENERATION_ERROR", error_msg)
         }
         
-        status_manager.update_status(error_data)
+        status_manager.update_status(error_data, persist=True)
         raise Exception(error_msg)
 
 
@@ -253,6 +403,7 @@ def _complete_task(result: Any, task_id: str, status_manager: TaskStatusManager)
         logger.warning(f"PPT路径为空，使用默认预览图: {task_id}")
     
     # 构建完成状态
+    now = utc_timestamp()
     final_data = {
         "status": "completed",
         "progress": 100,
@@ -260,12 +411,12 @@ def _complete_task(result: Any, task_id: str, status_manager: TaskStatusManager)
         "step_description": "PPT生成已完成",
         "file_url": f"/workspace/output/{task_id}/presentation.pptx",
         "preview_images": preview_images,
-        "completed_at": datetime.utcnow().isoformat(),
-        "updated_at": datetime.utcnow().isoformat(),
+        "completed_at": now,
+        "updated_at": now,
         "output_path": result.output_ppt_path
     }
     
-    status_manager.update_status(final_data)
+    status_manager.update_status(final_data, persist=True)
     logger.info(f"任务完成: task_id={task_id}")
     
     return {"task_id": task_id, **final_data}
@@ -275,22 +426,18 @@ def _handle_task_exception(e: Exception, task_id: str, status_manager: TaskStatu
     """处理任务异常"""
     logger.exception(f"PPT生成任务失败: {str(e)}")
     
+    now = utc_timestamp()
     error_data = {
         "status": "failed",
         "current_step": "error",
         "step_description": f"PPT生成失败: {str(e)}",
         "progress": 0,
-        "updated_at": datetime.utcnow().isoformat(),
-        "completed_at": datetime.utcnow().isoformat(),
-        "error": {
-            "has_error": True,
-            "error_code": "GENERATION_ERROR",
-            "error_message": str(e),
-            "can_retry": True
-        }
+        "updated_at": now,
+        "completed_at": now,
+        "error": _build_error("GENERATION_ERROR", str(e))
     }
     
-    status_manager.update_status(error_data)
+    status_manager.update_status(error_data, persist=True)
     return {"task_id": task_id, **error_data}
 
 
@@ -306,7 +453,7 @@ def generate_ppt_task(self, task_data: dict):
     logger.info(f"开始PPT生成任务: task_id={task_id}, template_id={task_data.get('template_id')}")
     
     # 初始化服务
-    redis_service = RedisService()
+    redis_service = get_redis_service()
     status_manager = TaskStatusManager(task_id, redis_service)
     
     try:
@@ -343,6 +490,9 @@ def generate_ppt_task(self, task_data: dict):
 def generate_preview_images(ppt_path: str) -> List[Dict[str, Any]]:
     """生成PPT预览图
     
+    与幻灯片验证相同，通过一次render_pptx_file调用渲染全部幻灯片（返回按页序排列的图像），
+    渲染结果先输出到临时目录，再重命名为 preview_{i}.png。
+    
     Args:
         ppt_path: PPT文件路径，可能为None
         
@@ -354,13 +504,37 @@ def generate_preview_images(ppt_path: str) -> List[Dict[str, Any]]:
         return []
         
     try:
-        # TODO: 实现PPT转图片的逻辑
-        # 这里简单返回一个模拟预览图列表
-        task_id = os.path.basename(os.path.dirname(ppt_path))
-        return [
-            {"slide_index": i, "preview_url": f"/workspace/output/{task_id}/preview_{i}.png"} 
-            for i in range(3)
-        ]
+        ppt_manager = PPTAgentHelper.init_ppt_manager()
+        if not ppt_manager:
+            logger.error("生成预览图失败: 无法初始化PPT管理器")
+            return []
+        
+        output_dir = Path(ppt_path).parent
+        task_id = output_dir.name
+        
+        # 渲染到临时目录，避免渲染输出的文件名与输出目录中的其他文件冲突
+        render_dir = output_dir / ".preview"
+        render_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            image_paths = ppt_manager.render_pptx_file(
+                pptx_path=ppt_path,
+                output_dir=str(render_dir)
+            )
+            if not image_paths:
+                logger.warning(f"幻灯片渲染结果为空: {ppt_path}")
+                return []
+            
+            previews = []
+            for slide_index, image_path in enumerate(image_paths):
+                image_filename = f"preview_{slide_index}.png"
+                os.replace(image_path, output_dir / image_filename)
+                previews.append({
+                    "slide_index": slide_index,
+                    "preview_url": f"/workspace/output/{task_id}/{image_filename}"
+                })
+            return previews
+        finally:
+            shutil.rmtree(render_dir, ignore_errors=True)
     except Exception as e:
         logger.error(f"生成预览图失败: {str(e)}")
-        return [] 
\ No newline at end of file
+        return []
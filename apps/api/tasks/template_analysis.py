@@ -1,31 +1,209 @@
-from apps.api.celery_app import celery_app
-from apps.api.services.redis_service import RedisService
+from apps.api.celery_app import celery_app, run_in_worker_loop
+from celery.signals import worker_process_init
+from apps.api.services.redis_service import RedisService, get_redis_service, utc_timestamp
 from core.agents.ppt_analysis_agent import PPTAnalysisAgent
-from apps.api.services.file_service import FileService
 from core.engine.state import AgentState
-from core.engine.cache_manager import CacheManager
+from core.engine.cache_manager import get_cache_manager
 from config.settings import settings
 from pathlib import Path
-import asyncio
 import json
 import os
 from datetime import datetime
 import logging
 from apps.api.models.database import Template
 from apps.api.models import SessionLocal
+from sqlalchemy import or_
 import time
+import queue
+import shutil
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Dict, Any, Optional, List, Tuple
 
 # 导入MLflow跟踪功能
 try:
     import mlflow
+    from mlflow.entities import Metric, Param
+    from mlflow.tracking import MlflowClient
     from core.monitoring import MLflowTracker
     HAS_MLFLOW = True
 except ImportError:
     HAS_MLFLOW = False
 
+# orjson为可选依赖，用于加速MLflow制品的JSON序列化
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 logger = logging.getLogger(__name__)
 
+# 批量UPDATE只能写入表中存在的列
+_TEMPLATE_HAS_ERROR_MESSAGE = "error_message" in Template.__table__.columns
+
+# MLflow后台写入队列：任务线程只负责入队，由每个worker进程的后台线程发送到跟踪服务器。
+# 每个操作携带创建运行时使用的跟踪URI，后台线程按URI创建客户端，不依赖线程启动时的全局设置。
+# 队列有上限，跟踪服务器长时间不可用时丢弃新记录，而不是无限占用内存或阻塞任务
+_MLFLOW_QUEUE_MAXSIZE = 1000
+_mlflow_queue: "queue.Queue[Tuple[str, Optional[str], tuple]]" = queue.Queue(maxsize=_MLFLOW_QUEUE_MAXSIZE)
+_mlflow_writer: Optional[threading.Thread] = None
+_mlflow_writer_lock = threading.Lock()
+
+# 模板预览图存放目录
+_PPT_ANALYSIS_BASE = Path(settings.WORKSPACE_DIR) / "cache" / "ppt_analysis"
+
+# 进度更新合并：距上次发送不足该间隔（秒）且进度变化小于该幅度的更新不写入Redis
+_PROGRESS_EMIT_MIN_INTERVAL = 0.1
+_PROGRESS_EMIT_MIN_DELTA = 5
+
+# 预览图移动线程池（每个worker进程一个，首次使用时创建）
+_preview_move_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _dumps_artifact_json(data: Any) -> str:
+    """将制品数据序列化为带缩进的JSON文本"""
+    if HAS_ORJSON:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
+
+def _mlflow_writer_loop() -> None:
+    """后台线程：依次执行队列中的MLflow写入操作"""
+    # 按跟踪URI缓存客户端：线程可能在跟踪器设置URI之前启动，客户端必须使用运行所在的服务器
+    clients: Dict[Optional[str], Any] = {}
+    while True:
+        op, tracking_uri, args = _mlflow_queue.get()
+        try:
+            if op == "barrier":
+                args[0].set()
+                continue
+            client = clients.get(tracking_uri)
+            if client is None:
+                client = clients[tracking_uri] = MlflowClient(tracking_uri=tracking_uri)
+            if op == "log_batch":
+                run_id, metrics, params = args
+                client.log_batch(run_id, metrics=metrics, params=params)
+            elif op == "log_json":
+                # 序列化也在后台线程完成，任务线程只传递对象引用
+                run_id, data, artifact_file = args
+                client.log_text(run_id, _dumps_artifact_json(data), artifact_file)
+        except Exception as e:
+            logger.warning(f"后台写入MLflow失败: op={op}, error={str(e)}")
+        finally:
+            _mlflow_queue.task_done()
+
+
+def _ensure_mlflow_writer() -> None:
+    """确保当前进程的MLflow后台写入线程在运行（fork后的子进程需要重新启动）"""
+    global _mlflow_writer
+    if _mlflow_writer and _mlflow_writer.is_alive():
+        return
+    with _mlflow_writer_lock:
+        if _mlflow_writer and _mlflow_writer.is_alive():
+            return
+        _mlflow_writer = threading.Thread(target=_mlflow_writer_loop, name="mlflow_writer", daemon=True)
+        _mlflow_writer.start()
+
+
+def _enqueue_mlflow(op: str, tracking_uri: Optional[str], *args) -> None:
+    """提交一个MLflow写入操作到后台线程，不阻塞调用方
+    
+    Args:
+        op: 操作类型（log_batch、log_json）
+        tracking_uri: 运行所在的MLflow跟踪服务器URI
+        *args: 操作参数
+    """
+    _ensure_mlflow_writer()
+    try:
+        _mlflow_queue.put_nowait((op, tracking_uri, args))
+    except queue.Full:
+        logger.warning(f"MLflow写入队列已满，丢弃记录: op={op}")
+
+
+def _wait_mlflow_queue(timeout: float = 2.0) -> None:
+    """等待此前提交的MLflow写入完成，最多等待timeout秒"""
+    if not (_mlflow_writer and _mlflow_writer.is_alive()):
+        return
+    done = threading.Event()
+    try:
+        _mlflow_queue.put(("barrier", None, (done,)), timeout=timeout)
+    except queue.Full:
+        logger.warning("MLflow写入队列已满，不再等待后台写入")
+        return
+    if not done.wait(timeout):
+        logger.warning(f"等待MLflow后台写入超时({timeout}秒)，剩余记录将在后台继续写入")
+
+
+@worker_process_init.connect
+def _init_worker_process(**kwargs):
+    """worker子进程启动时创建进程共享的服务实例和MLflow后台写入线程"""
+    get_redis_service()
+    get_cache_manager()
+    if HAS_MLFLOW:
+        _ensure_mlflow_writer()
+
+
+class _MLflowBatchLogger:
+    """MLflow批量记录器 - 缓存指标和参数，通过一次log_batch请求写入运行
+    
+    写入操作交给后台线程执行，任务线程不等待网络请求。run_id可以稍后设置：
+    MLflow运行尚未创建时记录的数据先缓存在内存中，运行创建后随下一次flush写入。
+    tracking_uri需在run_id之前设置，写入操作发送到创建运行的跟踪服务器。
+    """
+    
+    def __init__(self, run_id: Optional[str] = None, flush_every: int = 10,
+                 tracking_uri: Optional[str] = None):
+        self.run_id = run_id
+        self.tracking_uri = tracking_uri
+        self.flush_every = flush_every
+        self.metrics: List[Any] = []
+        self.params: List[Any] = []
+        # 进度步骤明细，任务结束时作为一个制品写入
+        self.steps: List[Dict[str, Any]] = []
+        
+    def log_metric(self, key: str, value: float, step: int = 0) -> None:
+        """缓存一个指标，累积到flush_every条时自动写入"""
+        self.metrics.append(Metric(key, value, int(time.time() * 1000), step))
+        if len(self.metrics) >= self.flush_every:
+            self.flush()
+            
+    def log_params(self, params: Dict[str, Any]) -> None:
+        """缓存一组参数，在下一次flush时写入"""
+        self.params.extend(Param(key, str(value)) for key, value in params.items())
+        
+    def record_step(self, step: str, progress: int, description: str, preview_data: dict = None) -> None:
+        """记录一次进度步骤：进度作为指标缓存，步骤明细留到结束时统一写入"""
+        self.log_metric("step_progress", progress, step=progress)
+        self.steps.append({
+            "step_name": step,
+            "step_description": description,
+            "progress": progress,
+            "preview_data": preview_data
+        })
+        
+    def flush(self, final: bool = False) -> None:
+        """将缓存的指标和参数一次性写入MLflow
+        
+        Args:
+            final: 是否为任务结束时的最后一次写入，是则同时写入进度步骤明细
+        """
+        if self.run_id is None:
+            return
+        if self.metrics or self.params:
+            metrics, self.metrics = self.metrics, []
+            params, self.params = self.params, []
+            _enqueue_mlflow("log_batch", self.tracking_uri, self.run_id, metrics, params)
+        if final and self.steps:
+            steps, self.steps = self.steps, []
+            self.log_json(steps, "progress_steps.json")
+    
+    def log_json(self, data: Any, artifact_file: str) -> None:
+        """将数据作为JSON制品写入运行，序列化和上传都在后台线程完成"""
+        if self.run_id is None:
+            return
+        _enqueue_mlflow("log_json", self.tracking_uri, self.run_id, data, artifact_file)
+
 
 class TemplateStatusManager:
     """模板状态管理器 - 统一处理Redis和数据库的数据同步"""
@@ -34,40 +212,66 @@ class TemplateStatusManager:
         self.task_id = task_id
         self.template_id = template_id
         self.redis_service = redis_service
+        # 本任务是否在记录MLflow，初始化跟踪后设置一次
+        self.mlflow_active = False
+        # 本任务在Redis中的完整状态；任务状态键只由本任务写入，首次读取后在本地合并即可
+        self._state: Optional[Dict[str, Any]] = None
+        
+    def update_task_status(self, status_data: Dict[str, Any], publish_state: bool = False) -> None:
+        """更新任务状态（仅Redis），状态写入和WebSocket通知通过一次pipeline发送
         
-    def update_task_status(self, status_data: Dict[str, Any]) -> None:
-        """更新任务状态（仅Redis）"""
-        self.redis_service.update_task_status(self.task_id, **status_data)
+        只有第一次更新需要读取Redis中已有的状态，之后的更新在本地合并，
+        每次更新只有一次写入+发布的往返。
         
-        # 发送WebSocket通知
-        websocket_data = {"task_id": self.task_id, **status_data}
-        self.redis_service.publish_task_update(self.task_id, websocket_data)
+        Args:
+            status_data: 状态数据
+            publish_state: 是否发布完整状态（用于终态）；完整状态只序列化一次，
+                写入和发布使用同一份JSON
+        """
+        if self._state is None:
+            self._state = self.redis_service.update_and_publish(self.task_id, **status_data)
+            return
+        
+        self._state.update(status_data)
+        self._state["updated_at"] = utc_timestamp()
+        if publish_state:
+            self._state["task_id"] = self.task_id
+            self.redis_service.pipeline_update_status(self.task_id, self._state)
+            return
+        
+        self.redis_service.pipeline_update_status(
+            self.task_id, self._state, {"task_id": self.task_id, **status_data}
+        )
         
     def update_template_status(self, status: str, analysis_path: str = None, 
                              analysis_time: datetime = None, preview_path: str = None, 
                              error_message: str = None) -> None:
         """更新数据库中的模板状态"""
+        # 只更新有变化的列，直接执行UPDATE，不先查询模板记录
+        values = {"status": status}
+        if analysis_path:
+            values["analysis_path"] = analysis_path
+        if analysis_time:
+            values["analysis_time"] = analysis_time
+        if preview_path:
+            values["preview_path"] = preview_path
+        # Template表目前没有error_message列，只有存在该列时才写入
+        if _TEMPLATE_HAS_ERROR_MESSAGE:
+            if error_message:
+                values["error_message"] = error_message
+            elif status == "ready":
+                values["error_message"] = None
+        
         try:
             with SessionLocal() as db:
-                template = db.query(Template).filter(Template.id == self.template_id).first()
-                if not template:
+                updated = db.query(Template).filter(Template.id == self.template_id).update(
+                    values, synchronize_session=False
+                )
+                db.commit()
+                if not updated:
                     logger.error(f"数据库中未找到模板记录: template_id={self.template_id}")
                     return
                 
-                # 更新状态
-                template.status = status
-                if analysis_path:
-                    template.analysis_path = analysis_path
-                if analysis_time:
-                    template.analysis_time = analysis_time
-                if preview_path:
-                    template.preview_path = preview_path
-                if error_message:
-                    template.error_message = error_message
-                elif status == "ready":
-                    template.error_message = None
-                
-                db.commit()
                 logger.info(f"已更新模板状态: template_id={self.template_id}, status={status}")
                 
         except Exception as e:
@@ -83,10 +287,32 @@ class TemplateStatusManager:
             logger.warning(f"清理任务关联失败: {str(e)}")
 
 
-def _check_template_existence_and_status(template_id: int, task_id: str) -> Tuple[Optional[Template], Optional[Dict[str, Any]]]:
-    """检查模板存在性和当前状态"""
+def _claim_template_for_analysis(template_id: int, task_id: str) -> Tuple[Optional[Template], Optional[Dict[str, Any]]]:
+    """检查模板状态并尝试将其设置为分析中
+    
+    常见情况下只需一条带条件的UPDATE：模板未在分析中、也未完成分析时直接设置为analyzing。
+    条件不满足时才查询模板记录，交给后续的已完成/分析中检查处理。
+    
+    Returns:
+        (模板记录, 错误响应)。成功设置为分析中时两者均为None。
+    """
     with SessionLocal() as db:
         try:
+            not_analyzing = or_(Template.status.is_(None), Template.status != "analyzing")
+            not_completed = or_(
+                Template.status.is_(None),
+                Template.status != "ready",
+                Template.analysis_path.is_(None),
+                Template.analysis_path == ""
+            )
+            claimed = db.query(Template).filter(
+                Template.id == template_id, not_analyzing, not_completed
+            ).update({"status": "analyzing"}, synchronize_session=False)
+            db.commit()
+            if claimed:
+                logger.info(f"开始分析模板: template_id={template_id}, task_id={task_id}")
+                return None, None
+            
             template = db.query(Template).filter(Template.id == template_id).first()
             if not template:
                 error_msg = f"模板不存在: template_id={template_id}"
@@ -106,6 +332,7 @@ def _check_template_existence_and_status(template_id: int, task_id: str) -> Tupl
             
         except Exception as e:
             logger.error(f"检查模板状态失败: template_id={template_id}, error={str(e)}")
+            db.rollback()
             return None, {
                 "template_id": template_id,
                 "status": "failed",
@@ -150,22 +377,6 @@ def _handle_analyzing_template(template: Template, template_id: int, task_id: st
     return None
 
 
-def _set_template_analyzing_status(template: Template, template_id: int, task_id: str) -> None:
-    """设置模板为分析中状态"""
-    with SessionLocal() as db:
-        try:
-            # 重新查询模板以获取最新状态
-            template = db.query(Template).filter(Template.id == template_id).first()
-            if template:
-                template.status = "analyzing"
-                db.commit()
-                logger.info(f"开始分析模板: template_id={template_id}, task_id={task_id}")
-        except Exception as e:
-            logger.error(f"设置模板分析状态失败: template_id={template_id}, error={str(e)}")
-            db.rollback()
-            raise
-
-
 def _initialize_mlflow_tracking(template_data: Dict[str, Any], task_id: str) -> Tuple[Optional[Any], bool]:
     """初始化MLflow跟踪器"""
     tracker = None
@@ -176,7 +387,7 @@ def _initialize_mlflow_tracking(template_data: Dict[str, Any], task_id: str) ->
             experiment_name = "ppt_template_analysis"
             tracker = MLflowTracker(experiment_name=experiment_name)
             logger.info(f"已启用MLflow模板分析跟踪: {experiment_name}")
-            tracker.start_workflow_run(task_id, "template_analysis")
+            tracker.create_workflow_run(task_id, "template_analysis")
         except Exception as e:
             logger.error(f"初始化MLflow跟踪器失败: {str(e)}")
             enable_tracking = False
@@ -184,40 +395,104 @@ def _initialize_mlflow_tracking(template_data: Dict[str, Any], task_id: str) ->
     return tracker, enable_tracking
 
 
-def _create_progress_callback(task_id: str, status_manager: TemplateStatusManager, 
-                            tracker: Optional[Any], enable_tracking: bool):
-    """创建进度回调函数"""
-    def progress_callback(step: str, progress: int, description: str, preview_data: dict = None):
-        # 更新Redis任务状态
-        status_manager.update_task_status({
-            "status": "analyzing",
-            "progress": progress,
-            "message": description,
-            "current_step": step,
-            "preview_data": preview_data
-        })
+def _start_mlflow_tracking(template_data: Dict[str, Any], task_id: str) -> Tuple[Optional[Future], Optional[_MLflowBatchLogger]]:
+    """在独立线程中初始化MLflow跟踪，与分析前的准备步骤并行执行
+    
+    返回(初始化结果Future, 批量记录器)。后台线程只执行实验查找和运行创建等网络请求，
+    不激活运行；运行由_finish_mlflow_tracking在任务线程上激活。运行创建完成后批量记录器
+    才会获得run_id，此前的进度记录先缓存在记录器中。
+    
+    Returns:
+        未启用跟踪时返回(None, None)
+    """
+    if not (template_data.get("enable_tracking", False) and HAS_MLFLOW):
+        return None, None
+    
+    future: Future = Future()
+    mlflow_batch = _MLflowBatchLogger()
+    
+    def _run():
+        try:
+            tracker, enable_tracking = _initialize_mlflow_tracking(template_data, task_id)
+        except BaseException as e:
+            logger.error(f"初始化MLflow跟踪器失败: {str(e)}")
+            tracker, enable_tracking = None, False
+        if enable_tracking and tracker and tracker.run_id:
+            mlflow_batch.tracking_uri = tracker.tracking_uri
+            mlflow_batch.run_id = tracker.run_id
+        future.set_result((tracker, enable_tracking))
+    
+    threading.Thread(target=_run, name=f"mlflow_init_{task_id}", daemon=True).start()
+    return future, mlflow_batch
+
+
+def _finish_mlflow_tracking(future: Optional[Future],
+                            mlflow_batch: Optional[_MLflowBatchLogger]) -> Tuple[Optional[Any], bool, Optional[_MLflowBatchLogger]]:
+    """等待MLflow初始化完成并在当前线程上激活运行，返回(tracker, enable_tracking, 批量记录器)
+    
+    MLflow的活动运行按线程隔离，必须在执行分析的任务线程上调用，分析中的OpenAI调用跟踪
+    才会关联到该运行。初始化失败时记录器为None。
+    """
+    if future is None:
+        return None, False, None
+    tracker, enable_tracking = future.result()
+    if mlflow_batch.run_id is None:
+        return tracker, enable_tracking, None
+    try:
+        tracker.activate_run()
+    except Exception as e:
+        # 未激活时运行仍可通过客户端记录和结束，只是OpenAI调用跟踪不会关联到该运行
+        logger.warning(f"在任务线程上激活MLflow运行失败: {str(e)}")
+    return tracker, enable_tracking, mlflow_batch
+
+
+class _ProgressReporter:
+    """模板分析进度回调
+    
+    同一步骤内的进度更新按最小间隔合并后再写入Redis：步骤切换、带预览数据、进度跨度较大
+    或完成时立即发送，其余更新在距上次发送不足最小间隔时跳过（随后的完成状态会覆盖它们）。
+    MLflow记录只在内存中缓存，不做合并。
+    """
+    
+    __slots__ = ("status_manager", "mlflow_batch", "last_emit_time", "last_progress", "last_step")
+    
+    def __init__(self, status_manager: TemplateStatusManager, mlflow_batch: Optional[_MLflowBatchLogger]):
+        self.status_manager = status_manager
+        self.mlflow_batch = mlflow_batch
+        self.last_emit_time = 0.0
+        self.last_progress: Optional[int] = None
+        self.last_step: Optional[str] = None
+    
+    def __call__(self, step: str, progress: int, description: str, preview_data: dict = None) -> None:
+        now = time.monotonic()
+        should_emit = (
+            step != self.last_step
+            or preview_data
+            or progress >= 100
+            or self.last_progress is None
+            or abs(progress - self.last_progress) >= _PROGRESS_EMIT_MIN_DELTA
+            or now - self.last_emit_time >= _PROGRESS_EMIT_MIN_INTERVAL
+        )
+        
+        if should_emit:
+            # 更新Redis任务状态
+            self.status_manager.update_task_status({
+                "status": "analyzing",
+                "progress": progress,
+                "message": description,
+                "current_step": step,
+                "preview_data": preview_data
+            })
+            self.last_emit_time, self.last_progress, self.last_step = now, progress, step
         
         # 记录进度到MLflow
-        if enable_tracking and tracker and HAS_MLFLOW:
+        mlflow_batch = self.mlflow_batch
+        if mlflow_batch:
             try:
-                mlflow.log_metric("progress", progress)
-                
-                current_step = f"{step}_{progress}"
-                with mlflow.start_run(run_name=current_step, nested=True):
-                    mlflow.log_param("step_name", step)
-                    mlflow.log_param("step_description", description)
-                    mlflow.log_metric("step_progress", progress)
-                    
-                    if preview_data:
-                        try:
-                            preview_summary = json.dumps(preview_data)
-                            mlflow.log_text(preview_summary, f"preview_{step}_{progress}.json")
-                        except:
-                            pass
+                mlflow_batch.log_metric("progress", progress, step=progress)
+                mlflow_batch.record_step(step, progress, description, preview_data)
             except Exception as e:
                 logger.warning(f"记录进度到MLflow失败: {str(e)}")
-    
-    return progress_callback
 
 
 def _execute_template_analysis(template_data: Dict[str, Any], task_id: str, 
@@ -236,60 +511,101 @@ def _execute_template_analysis(template_data: Dict[str, Any], task_id: str,
     agent.node_executor.set_progress_callback(progress_callback)
     
     # 执行分析
-    return asyncio.run(agent.run(state, progress_callback=progress_callback))
+    return run_in_worker_loop(agent.run(state, progress_callback=progress_callback))
+
+
+def _hash_template_file(file_path: str) -> Optional[str]:
+    """计算模板文件内容哈希，文件无法读取时返回None（交由分析流程报告错误）"""
+    try:
+        return get_cache_manager().compute_file_hash(file_path)
+    except OSError as e:
+        logger.warning(f"计算模板文件哈希失败: {file_path} - {str(e)}")
+        return None
+
+
+def _load_analysis_by_hash(content_hash: Optional[str], file_path: str) -> Optional[Dict[str, Any]]:
+    """查找内容相同的模板已有的分析结果
+    
+    缓存中的slideImages指向之前模板的预览图，预览图已被删除时视为未命中，重新分析。
+    """
+    if not content_hash:
+        return None
+    cached = get_cache_manager().get_ppt_analysis_cache_by_hash(content_hash)
+    if not cached:
+        return None
+    slide_images = cached.get("slideImages", [])
+    if len(_list_existing_files(slide_images)) != len(slide_images):
+        return None
+    logger.info(f"模板内容已分析过，复用分析结果: hash={content_hash}")
+    return {**cached, "templateName": Path(file_path).stem}
+
+
+def _save_analysis_by_hash(content_hash: Optional[str], analysis_result: Dict[str, Any],
+                           template_id: int, preview_images: List[str]) -> None:
+    """按内容哈希保存分析结果，slideImages改为本模板的预览图路径，供之后相同内容的模板复制"""
+    if not content_hash or len(preview_images) != len(analysis_result.get("slideImages", [])):
+        return
+    target_dir = _PPT_ANALYSIS_BASE / str(template_id)
+    try:
+        get_cache_manager().save_ppt_analysis_cache_by_hash(content_hash, {
+            **analysis_result,
+            "slideImages": [str(target_dir / url.rsplit("/", 1)[-1]) for url in preview_images]
+        })
+    except Exception as e:
+        logger.warning(f"按内容哈希保存分析结果失败: {str(e)}")
 
 
 def _save_analysis_results(template_data: Dict[str, Any], analysis_result: Dict[str, Any]) -> str:
     """保存分析结果到缓存"""
-    cache_manager = CacheManager()
+    cache_manager = get_cache_manager()
     ppt_path = Path(template_data["file_path"])
     return cache_manager.save_ppt_analysis_cache(str(ppt_path), analysis_result)
 
 
 def _log_mlflow_results(analysis_result: Dict[str, Any], template_data: Dict[str, Any], 
-                       task_id: str, cache_path: str, tracker: Optional[Any], 
-                       enable_tracking: bool) -> None:
+                       task_id: str, cache_path: str, 
+                       mlflow_batch: Optional[_MLflowBatchLogger]) -> None:
     """记录分析结果到MLflow"""
-    if not (enable_tracking and tracker and HAS_MLFLOW):
+    if not mlflow_batch:
         return
         
+    # 记录关键结果指标，连同尚未写入的进度指标在结束运行时一次提交
+    mlflow_batch.log_params({
+        "template_name": analysis_result.get("templateName", "未知"),
+        "slide_count": len(analysis_result.get("slides", [])),
+        "template_id": template_data.get("template_id", 0),
+        "template_path": template_data["file_path"],
+        "cache_path": str(cache_path)
+    })
+    
+    # 记录完整分析结果，序列化和上传都在后台线程完成
+    mlflow_batch.log_json(analysis_result, "analysis_summary/full.json")
+
+
+def _end_mlflow_run(tracker: Any, mlflow_batch: _MLflowBatchLogger, status: str) -> None:
+    """写入剩余的MLflow记录并结束运行，MLflow出错只记录警告，不影响任务结果"""
     try:
-        # 记录关键结果指标
-        mlflow.log_param("template_name", analysis_result.get("templateName", "未知"))
-        mlflow.log_param("slide_count", len(analysis_result.get("slides", [])))
-        mlflow.log_param("template_id", template_data.get("template_id", 0))
-        mlflow.log_param("template_path", template_data["file_path"])
-        mlflow.log_param("cache_path", str(cache_path))
-        
-        # 记录分析结果摘要
-        try:
-            summary_path = f"/tmp/template_analysis_{task_id}_summary.json"
-            with open(summary_path, "w") as f:
-                json.dump({
-                    "templateName": analysis_result.get("templateName", "未知"),
-                    "slideCount": len(analysis_result.get("slides", [])),
-                    "layouts": [slide.get("layoutName", "未知") for slide in analysis_result.get("slides", [])],
-                    "themeColors": analysis_result.get("themeColors", []),
-                    "fontFamilies": analysis_result.get("fontFamilies", [])
-                }, f, indent=2)
-            mlflow.log_artifact(summary_path, "analysis_summary")
-            os.remove(summary_path)
-        except Exception as e:
-            logger.warning(f"记录分析结果摘要到MLflow失败: {str(e)}")
+        mlflow_batch.flush(final=True)
+        _wait_mlflow_queue()
+        tracker.end_workflow_run(status)
     except Exception as e:
-        logger.warning(f"记录分析结果到MLflow失败: {str(e)}")
+        logger.warning(f"结束MLflow运行失败: status={status}, error={str(e)}")
 
 
 def _complete_analysis_task(template_data: Dict[str, Any], analysis_result: Dict[str, Any], 
                           cache_path: str, task_id: str, status_manager: TemplateStatusManager,
-                          tracker: Optional[Any], enable_tracking: bool) -> Dict[str, Any]:
+                          tracker: Optional[Any], mlflow_batch: Optional[_MLflowBatchLogger],
+                          content_hash: Optional[str] = None, from_cache: bool = False) -> Dict[str, Any]:
     """完成分析任务"""
-    # 生成预览图
+    # 生成预览图（复用的分析结果中的图片属于其他模板，复制而不是移动）
     preview_images = generate_template_previews(
         template_data["file_path"],
         template_data["template_id"],
-        analysis_result
+        analysis_result,
+        keep_source=from_cache
     )
+    if not from_cache:
+        _save_analysis_by_hash(content_hash, analysis_result, template_data["template_id"], preview_images)
     
     # 更新任务完成状态
     status_manager.update_task_status({
@@ -298,8 +614,8 @@ def _complete_analysis_task(template_data: Dict[str, Any], analysis_result: Dict
         "message": "模板分析完成",
         "analysis_file_path": str(cache_path),
         "preview_images": preview_images,
-        "completed_at": datetime.utcnow().isoformat()
-    })
+        "completed_at": utc_timestamp()
+    }, publish_state=True)
     
     # 更新数据库中的模板状态
     status_manager.update_template_status(
@@ -312,9 +628,9 @@ def _complete_analysis_task(template_data: Dict[str, Any], analysis_result: Dict
     # 清理任务关联
     status_manager.clear_task_association(is_success=True)
     
-    # 结束MLflow跟踪
-    if enable_tracking and tracker:
-        tracker.end_workflow_run("FINISHED")
+    # 结束MLflow跟踪（先等待后台线程写完本任务的记录）
+    if status_manager.mlflow_active:
+        _end_mlflow_run(tracker, mlflow_batch, "FINISHED")
     
     return {
         "analysis_result": analysis_result,
@@ -326,7 +642,8 @@ def _complete_analysis_task(template_data: Dict[str, Any], analysis_result: Dict
 
 def _handle_analysis_exception(e: Exception, template_data: Dict[str, Any], task_id: str,
                              status_manager: TemplateStatusManager, tracker: Optional[Any],
-                             enable_tracking: bool) -> Dict[str, Any]:
+                             enable_tracking: bool,
+                             mlflow_batch: Optional[_MLflowBatchLogger] = None) -> Dict[str, Any]:
     """处理分析异常"""
     logger.exception(f"模板分析任务失败: {str(e)}")
     
@@ -341,7 +658,7 @@ def _handle_analysis_exception(e: Exception, template_data: Dict[str, Any], task
     }
     
     # 更新任务状态
-    status_manager.update_task_status(error_data)
+    status_manager.update_task_status(error_data, publish_state=True)
     
     # 更新数据库模板状态
     status_manager.update_template_status(status="failed", error_message=str(e))
@@ -350,12 +667,9 @@ def _handle_analysis_exception(e: Exception, template_data: Dict[str, Any], task
     status_manager.clear_task_association(is_success=False)
     
     # 记录失败到MLflow
-    if enable_tracking and tracker and HAS_MLFLOW:
-        try:
-            mlflow.log_param("error_message", str(e))
-            tracker.end_workflow_run("FAILED")
-        except Exception as log_error:
-            logger.warning(f"记录失败到MLflow失败: {str(log_error)}")
+    if status_manager.mlflow_active:
+        mlflow_batch.log_params({"error_message": str(e)})
+        _end_mlflow_run(tracker, mlflow_batch, "FAILED")
     
     return {
         "template_id": template_data.get("template_id"),
@@ -375,7 +689,7 @@ def analyze_template_task(self, template_data: dict):
     template_id = template_data.get("template_id")
     
     # 初始化服务
-    redis_service = RedisService()
+    redis_service = get_redis_service()
     status_manager = TemplateStatusManager(task_id, template_id, redis_service)
     
     # 保存任务ID与模板ID的关联
@@ -383,69 +697,162 @@ def analyze_template_task(self, template_data: dict):
         redis_service.save_template_analysis_task_id(template_id, task_id)
     
     try:
-        # 1. 检查模板存在性和状态
-        template, error_response = _check_template_existence_and_status(template_id, task_id)
+        # 1. 检查模板状态，可分析时直接设置为分析中状态
+        template, error_response = _claim_template_for_analysis(template_id, task_id)
         if error_response:
             return error_response
         
-        # 2. 处理已完成的模板
-        completed_response = _handle_completed_template(template, template_id)
-        if completed_response:
-            return completed_response
-        
-        # 3. 处理正在分析中的模板
-        analyzing_response = _handle_analyzing_template(template, template_id, task_id, redis_service)
-        if analyzing_response:
-            return analyzing_response
-        
-        # 4. 设置模板为分析中状态
-        _set_template_analyzing_status(template, template_id, task_id)
-        
-        # 5. 初始化MLflow跟踪
-        tracker, enable_tracking = _initialize_mlflow_tracking(template_data, task_id)
-        
-        # 6. 开始分析任务
-        status_manager.update_task_status({
-            "status": "analyzing",
-            "progress": 10,
-            "message": "开始分析PPT模板"
-        })
+        if template is not None:
+            # 2. 处理已完成的模板
+            completed_response = _handle_completed_template(template, template_id)
+            if completed_response:
+                return completed_response
+            
+            # 3. 处理正在分析中的模板（未被其他任务占用时继续分析）
+            analyzing_response = _handle_analyzing_template(template, template_id, task_id, redis_service)
+            if analyzing_response:
+                return analyzing_response
         
-        # 7. 创建进度回调
-        progress_callback = _create_progress_callback(task_id, status_manager, tracker, enable_tracking)
+        # 4. 在后台线程初始化MLflow跟踪，与分析前的准备步骤并行
+        #    此后任何一步出错都要先取得初始化结果，异常处理才能将已创建的运行标记为FAILED
+        tracking_future, mlflow_batch = _start_mlflow_tracking(template_data, task_id)
+        try:
+            # 5. 开始分析任务（必须先于进度回调写入Redis）
+            status_manager.update_task_status({
+                "status": "analyzing",
+                "progress": 10,
+                "message": "开始分析PPT模板"
+            })
+
+            # 6. 创建进度回调
+            progress_callback = _ProgressReporter(status_manager, mlflow_batch)
+
+            # 7. 查找内容相同的模板已有的分析结果
+            content_hash = _hash_template_file(template_data["file_path"])
+            analysis_result = _load_analysis_by_hash(content_hash, template_data["file_path"])
+            from_cache = analysis_result is not None
+        finally:
+            # 8. 取得MLflow初始化结果并在任务线程上激活运行，须在分析开始前完成，
+            #    OpenAI调用跟踪才会关联到该运行
+            tracker, enable_tracking, mlflow_batch = _finish_mlflow_tracking(tracking_future, mlflow_batch)
+            status_manager.mlflow_active = mlflow_batch is not None
         
-        # 8. 执行模板分析
-        updated_state = _execute_template_analysis(template_data, task_id, progress_callback)
+        # 9. 执行模板分析（已有分析结果时直接复用）
+        if not from_cache:
+            updated_state = _execute_template_analysis(template_data, task_id, progress_callback)
+            analysis_result = updated_state.layout_features
         
-        # 9. 获取和保存分析结果
-        analysis_result = updated_state.layout_features
+        # 10. 保存分析结果
         cache_path = _save_analysis_results(template_data, analysis_result)
         
-        # 10. 记录结果到MLflow
-        _log_mlflow_results(analysis_result, template_data, task_id, cache_path, tracker, enable_tracking)
+        # 11. 记录结果到MLflow
+        _log_mlflow_results(analysis_result, template_data, task_id, cache_path, mlflow_batch)
         
-        # 11. 完成任务
+        # 12. 完成任务
         return _complete_analysis_task(template_data, analysis_result, cache_path, task_id, 
-                                     status_manager, tracker, enable_tracking)
+                                     status_manager, tracker, mlflow_batch,
+                                     content_hash, from_cache)
         
     except Exception as e:
         # 统一异常处理
-        return _handle_analysis_exception(e, template_data, task_id, status_manager, tracker if 'tracker' in locals() else None, enable_tracking if 'enable_tracking' in locals() else False)
+        return _handle_analysis_exception(e, template_data, task_id, status_manager, tracker if 'tracker' in locals() else None, enable_tracking if 'enable_tracking' in locals() else False,
+                                          mlflow_batch if 'mlflow_batch' in locals() else None)
+
+
+def _get_preview_move_executor() -> ThreadPoolExecutor:
+    """获取worker进程内共享的预览图移动线程池"""
+    global _preview_move_executor
+    if _preview_move_executor is None:
+        _preview_move_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="template_preview")
+    return _preview_move_executor
+
+
+def _list_existing_files(paths: List[str]) -> set:
+    """返回paths中实际存在的文件，每个目录只读取一次，而不是逐个stat"""
+    dir_entries: Dict[str, set] = {}
+    existing = set()
+    for path in paths:
+        if not path:
+            continue
+        dirname, basename = os.path.split(path)
+        if dirname not in dir_entries:
+            try:
+                with os.scandir(dirname or ".") as entries:
+                    dir_entries[dirname] = {entry.name for entry in entries}
+            except OSError:
+                dir_entries[dirname] = set()
+        if basename in dir_entries[dirname]:
+            existing.add(path)
+    return existing
+
+
+def _move_across_devices(src: str, dst: Path) -> None:
+    """跨文件系统移动文件：在内核中完成复制（copy_file_range），随后删除源文件
+    
+    不支持copy_file_range时退回shutil.copyfile（Linux上同样使用sendfile在内核中复制）。
+    """
+    try:
+        with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+            remaining = os.fstat(fsrc.fileno()).st_size
+            while remaining > 0:
+                copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                if copied == 0:
+                    break
+                remaining -= copied
+    except (AttributeError, OSError):
+        shutil.copyfile(src, dst)
+    shutil.copystat(src, dst)
+    os.remove(src)
+
+
+def _move_preview_image(index: int, image_path: str, target_dir: Path, url_prefix: str,
+                        keep_source: bool = False) -> Optional[str]:
+    """将单张幻灯片图片移动到模板预览目录
+    
+    Args:
+        keep_source: 是否保留源文件（源图片属于其他模板时复制而不是移动）
+    
+    Returns:
+        预览图URL，移动失败时返回None
+    """
+    # 构建新的文件名和路径
+    image_filename = f"slide_{index+1}.png"
+    target_path = target_dir / image_filename
+    
+    try:
+        if keep_source:
+            # 重新分析同一模板时源图片就是目标图片，无需复制
+            if Path(image_path) != target_path:
+                shutil.copyfile(image_path, target_path)
+                logger.info(f"已复制图片: {image_path} -> {target_path}")
+            return f"{url_prefix}/{image_filename}"
+        
+        # 移动图片文件：同一文件系统内直接重命名，跨文件系统时退回到复制+删除
+        try:
+            os.replace(image_path, target_path)
+        except OSError:
+            _move_across_devices(image_path, target_path)
+        
+        logger.info(f"已移动图片: {image_path} -> {target_path}")
+        return f"{url_prefix}/{image_filename}"
+    except Exception as e:
+        logger.error(f"移动图片时出错: {str(e)}")
+        return None
 
 
-def generate_template_previews(template_path: str, template_id: int, analysis_result: dict = None) -> List[str]:
+def generate_template_previews(template_path: str, template_id: int, analysis_result: dict = None,
+                               keep_source: bool = False) -> List[str]:
     """生成模板预览图，将渲染好的PPT图片移动到对应template_id目录下
     
     Args:
         template_path: 模板文件路径
         template_id: 模板ID
         analysis_result: 分析结果，包含slideImages字段
+        keep_source: 是否保留源图片（复用其他模板的分析结果时复制图片）
         
     Returns:
         预览图URL列表
     """
-    import shutil
-    
     # 如果没有分析结果或者不包含slideImages，返回空列表
     if not analysis_result or "slideImages" not in analysis_result:
         logger.warning(f"没有找到PPT渲染图片数据，template_id={template_id}")
@@ -458,34 +865,23 @@ def generate_template_previews(template_path: str, template_id: int, analysis_re
         return []
     
     # 确保目标目录存在
-    target_dir = Path(settings.WORKSPACE_DIR) / "cache" / "ppt_analysis" / str(template_id)
+    target_dir = _PPT_ANALYSIS_BASE / str(template_id)
     target_dir.mkdir(parents=True, exist_ok=True)
+    url_prefix = f"/workspace/cache/ppt_analysis/{template_id}"
     
-    # 存储新的图片路径
-    new_image_paths = []
-    
-    # 处理每个图片
+    # 按目录批量检查图片是否存在
+    existing = _list_existing_files(slide_images)
+    to_move = []
     for i, image_path in enumerate(slide_images):
-        if not image_path or not os.path.exists(image_path):
+        if image_path in existing:
+            to_move.append((i, image_path))
+        else:
             logger.warning(f"图片路径不存在: {image_path}")
-            continue
-        
-        # 构建新的文件名和路径
-        image_filename = f"slide_{i+1}.png"
-        target_path = target_dir / image_filename
-        
-        try:
-            # 移动图片文件
-            shutil.copy2(image_path, target_path)
-            
-            # 记录新路径
-            new_path = f"/workspace/cache/ppt_analysis/{template_id}/{image_filename}"
-            new_image_paths.append(new_path)
-            
-            # 删除原文件
-            os.remove(image_path)
-            logger.info(f"已移动并删除原图片: {image_path} -> {target_path}")
-        except Exception as e:
-            logger.error(f"移动图片时出错: {str(e)}")
     
-    return new_image_paths
\ No newline at end of file
+    # 并行移动各页图片，map保持幻灯片顺序（第一张作为模板封面）
+    executor = _get_preview_move_executor()
+    moved = executor.map(
+        lambda item: _move_preview_image(item[0], item[1], target_dir, url_prefix, keep_source),
+        to_move
+    )
+    return [url for url in moved if url]
@@ -15,76 +15,81 @@
 - 统一了各个Agent模块的类型引用，确保系统一致性
 """
 
-# 内容语义类型定义
-SEMANTIC_TYPES = """
-### 内容语义类型(semantic_type)
-- introduction: 介绍性内容，如标题页、简介页
-- toc: 目录页，内容提纲或章节概览
-- section_header: 章节标题页，表示内容分隔和组织结构
-- bullet_list: 要点列表，无序列表形式呈现的要点内容
-- process_description: 过程或步骤描述，展示工作流程或操作顺序
-- data_presentation: 数据展示，包含图表、数字或统计内容
-- comparison: 对比内容，对比不同概念、方法或成果
-- feature_list: 特性列表，产品或概念的关键特点并列展示
-- summary: 总结内容，内容概括或要点回顾
-- conclusion: 结论，基于前文分析得出的结论性内容
-- thank_you: 感谢/结束页，表示演示结束
-- concept: 概念性内容，解释、定义或介绍概念
-- instruction: 指导性内容，教程或操作指南
-- task: 任务描述内容，任务要求或行动指南
-- question_answer: 问答式内容，包含问题和对应回答
-- example_list: 示例列表，实例或案例的集合
-- case_study: 案例分析，详细分析特定实例的情况
-- timeline: 时间线内容，按时间顺序排列的事件或进展
-- list: 列表型内容，包含有序或无序的项目集合
-- values_presentation: 价值观展示，呈现理念、价值或重要信息
-- methodology: 方法论内容，描述处理问题的系统方法或框架
-- technical_guide: 技术指南，详细的技术操作或实现步骤
-- future_outlook: 未来展望，对未来趋势或发展的预测和描述
-- learning_objective: 学习目标，明确描述教学或培训的具体目标
-"""
+def _format_type_list(definitions):
+    """将类型定义字典格式化为填入prompt的Markdown列表，新增类型只需修改对应字典"""
+    return "\n" + "\n".join(f"- {name}: {description}" for name, description in definitions.items()) + "\n"
 
-# 内容关系类型定义
-RELATION_TYPES = """
-### 内容关系类型(relation_type)
-- none: 无特定关系，内容之间没有明确的关联性
-- sequence: 顺序关系，内容按特定顺序排列，如步骤、阶段或时间顺序
-- timeline: 时间线/时序关系，内容按时间先后顺序排列
-- hierarchical: 层级关系，内容呈现分类、从属或组织结构关系
-- comparison: 对比关系，内容展示不同选项之间的对比与比较
-- cause_effect: 因果关系，展示原因与结果、影响与后果的关系
-- problem_solution: 问题解决关系，展示问题与对应的解决方案
-- grid: 网格排列关系，多个平行概念或特性的并列展示
-- parallel: 并列关系，几个同等重要的元素并列展示
-- progressive: 渐进关系，内容呈现逐步深入或递进的关系
-- cyclical: 循环关系，内容呈现周期性或循环性的变化
-- spatial: 空间关系，内容按照空间位置或地理分布组织
-"""
 
-# 内容结构类型定义
-CONTENT_STRUCTURES = """
-### 内容区域组织结构(content_structure)
-- title_content: 标题+正文结构（最基本的布局）
-- detail_content: 详细内容结构（包含多个详细说明的文本块）
-- bullet_list: 项目符号列表结构
-- numbered_list: 编号列表结构
-- process_flow: 流程图结构（有明确的步骤顺序和连接）
-- comparison_table: 对比表格结构
-- grid_layout: 网格布局结构（项目以网格方式排列）
-- image_text_pair: 图文对结构（图片+对应说明文字）
-- central_focus: 中心辐射结构（中心概念+周边说明）
-- timeline: 时间线结构
-- free_form: 自由排布结构（无明确组织模式）
-- feature_group: 特性分组结构（多个特性或功能的分组展示）
-- question_set: 问题集合结构（一组相关问题的集合）
-- paired_content: 成对内容结构（内容以对的形式组织）
-- split_screen: 分屏结构（内容在屏幕两侧分开展示）
-"""
+# 以下类型定义和判断指南直接填入prompt对应小节（小节标题由prompt模板提供），不自带标题行
+
+# 内容语义类型定义（类型名 → 说明）
+SEMANTIC_TYPE_DEFINITIONS = {
+    "introduction": "介绍性内容，如标题页、简介页",
+    "toc": "目录页，内容提纲或章节概览",
+    "section_header": "章节标题页，表示内容分隔和组织结构",
+    "bullet_list": "要点列表，无序列表形式呈现的要点内容",
+    "process_description": "过程或步骤描述，展示工作流程或操作顺序",
+    "data_presentation": "数据展示，包含图表、数字或统计内容",
+    "comparison": "对比内容，对比不同概念、方法或成果",
+    "feature_list": "特性列表，产品或概念的关键特点并列展示",
+    "summary": "总结内容，内容概括或要点回顾",
+    "conclusion": "结论，基于前文分析得出的结论性内容",
+    "thank_you": "感谢/结束页，表示演示结束",
+    "concept": "概念性内容，解释、定义或介绍概念",
+    "instruction": "指导性内容，教程或操作指南",
+    "task": "任务描述内容，任务要求或行动指南",
+    "question_answer": "问答式内容，包含问题和对应回答",
+    "example_list": "示例列表，实例或案例的集合",
+    "case_study": "案例分析，详细分析特定实例的情况",
+    "timeline": "时间线内容，按时间顺序排列的事件或进展",
+    "list": "列表型内容，包含有序或无序的项目集合",
+    "values_presentation": "价值观展示，呈现理念、价值或重要信息",
+    "methodology": "方法论内容，描述处理问题的系统方法或框架",
+    "technical_guide": "技术指南，详细的技术操作或实现步骤",
+    "future_outlook": "未来展望，对未来趋势或发展的预测和描述",
+    "learning_objective": "学习目标，明确描述教学或培训的具体目标",
+}
+SEMANTIC_TYPES = _format_type_list(SEMANTIC_TYPE_DEFINITIONS)
+
+# 内容关系类型定义（类型名 → 说明）
+RELATION_TYPE_DEFINITIONS = {
+    "none": "无特定关系，内容之间没有明确的关联性",
+    "sequence": "顺序关系，内容按特定顺序排列，如步骤、阶段或时间顺序",
+    "timeline": "时间线/时序关系，内容按时间先后顺序排列",
+    "hierarchical": "层级关系，内容呈现分类、从属或组织结构关系",
+    "comparison": "对比关系，内容展示不同选项之间的对比与比较",
+    "cause_effect": "因果关系，展示原因与结果、影响与后果的关系",
+    "problem_solution": "问题解决关系，展示问题与对应的解决方案",
+    "grid": "网格排列关系，多个平行概念或特性的并列展示",
+    "parallel": "并列关系，几个同等重要的元素并列展示",
+    "progressive": "渐进关系，内容呈现逐步深入或递进的关系",
+    "cyclical": "循环关系，内容呈现周期性或循环性的变化",
+    "spatial": "空间关系，内容按照空间位置或地理分布组织",
+}
+RELATION_TYPES = _format_type_list(RELATION_TYPE_DEFINITIONS)
+
+# 内容结构类型定义（类型名 → 说明）
+CONTENT_STRUCTURE_DEFINITIONS = {
+    "title_content": "标题+正文结构（最基本的布局）",
+    "detail_content": "详细内容结构（包含多个详细说明的文本块）",
+    "bullet_list": "项目符号列表结构",
+    "numbered_list": "编号列表结构",
+    "process_flow": "流程图结构（有明确的步骤顺序和连接）",
+    "comparison_table": "对比表格结构",
+    "grid_layout": "网格布局结构（项目以网格方式排列）",
+    "image_text_pair": "图文对结构（图片+对应说明文字）",
+    "central_focus": "中心辐射结构（中心概念+周边说明）",
+    "timeline": "时间线结构",
+    "free_form": "自由排布结构（无明确组织模式）",
+    "feature_group": "特性分组结构（多个特性或功能的分组展示）",
+    "question_set": "问题集合结构（一组相关问题的集合）",
+    "paired_content": "成对内容结构（内容以对的形式组织）",
+    "split_screen": "分屏结构（内容在屏幕两侧分开展示）",
+}
+CONTENT_STRUCTURES = _format_type_list(CONTENT_STRUCTURE_DEFINITIONS)
 
 # 语义类型判断指南
 SEMANTIC_TYPE_GUIDELINES = """
-### 语义类型判断指南
-
 1. 基于内容特征判断:
    - 纯介绍性/导入内容 → introduction
    - 展示章节大纲或目录 → toc
@@ -131,8 +136,6 @@ SEMANTIC_TYPE_GUIDELINES = """
 
 # 关系类型判断指南
 RELATION_TYPE_GUIDELINES = """
-### 关系类型判断指南
-
 1. 基于内容间关系判断:
    - 无明确关联的内容 → none
    - 按步骤或程序排列的内容 → sequence
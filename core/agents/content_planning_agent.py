@@ -10,14 +10,14 @@
 import logging
 import json
 import re
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 
 from core.agents.base_agent import BaseAgent
 from core.engine.state import AgentState
 from core.llm.model_manager import ModelManager
 from core.utils.model_helper import ModelHelper
 from core.utils.ppt_agent_helper import PPTAgentHelper
-from core.utils.prompt_loader import prompt_loader
+from core.utils.prompt_loader import prompt_loader, dumps_prompt_json
 
 logger = logging.getLogger(__name__)
 
@@ -139,8 +139,8 @@ class ContentPlanningAgent(BaseAgent):
         Returns:
             完整的内容规划
         """
-        # 构建提示词
-        prompt = self._build_planning_prompt(sections, available_layouts)
+        # 构建提示词：固定的规则说明作为system消息，布局和章节数据作为user消息
+        system_prompt, prompt = self._build_planning_prompt(sections, available_layouts)
         
         # 使用重试机制生成内容计划
         empty_plan = {"slides": [], "slide_count": 0}
@@ -156,7 +156,8 @@ class ContentPlanningAgent(BaseAgent):
                 max_retries=self.max_retries,
                 model_type=self.model_type,
                 custom_api_key=self.custom_api_key,
-                custom_api_base=self.custom_api_base
+                custom_api_base=self.custom_api_base,
+                system_prompt=system_prompt
             )
             
             # 解析LLM响应
@@ -182,7 +183,7 @@ class ContentPlanningAgent(BaseAgent):
         self, 
         sections: List[Dict[str, Any]], 
         layouts: List[Dict[str, Any]]
-    ) -> str:
+    ) -> Tuple[str, str]:
         """
         构建用于内容规划的提示词
         
@@ -191,11 +192,11 @@ class ContentPlanningAgent(BaseAgent):
             layouts: 可用布局列表（基于视觉分析）
             
         Returns:
-            提示词
+            (系统提示词, 用户提示词)
         """
         # 将sections和layouts转换为格式化的JSON字符串
-        sections_json = json.dumps(sections, ensure_ascii=False, indent=2)
-        layouts_json = json.dumps(layouts, ensure_ascii=False, indent=2)
+        sections_json = dumps_prompt_json(sections)
+        layouts_json = dumps_prompt_json(layouts)
         
         # 构建上下文
         context = {
@@ -204,7 +205,7 @@ class ContentPlanningAgent(BaseAgent):
         }
         
         # 使用新的YAML格式prompt加载器
-        return prompt_loader.render_prompt("content_planning_prompts", context)
+        return prompt_loader.render_prompt_parts("content_planning_prompts", context)
     
     def _parse_llm_response(
         self, 
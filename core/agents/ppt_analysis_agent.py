@@ -19,7 +19,7 @@ from core.engine.state import AgentState
 from core.llm.model_manager import ModelManager
 from core.utils.model_helper import ModelHelper
 from core.utils.ppt_agent_helper import PPTAgentHelper
-from core.utils.prompt_loader import PromptLoader
+from core.utils.prompt_loader import PromptLoader, dumps_prompt_json
 from config.content_types import (
     SEMANTIC_TYPES,
     RELATION_TYPES,
@@ -313,9 +313,9 @@ class PPTAnalysisAgent(BaseAgent):
             logger.warning("没有要分析的图像")
             return None
         
-        # 构建提示词
+        # 构建提示词：固定的分析规则作为system消息，本批次的幻灯片数据作为user消息
         template_info = {"slides": slides_json}
-        prompt = self._build_analysis_prompt(image_paths, template_info)
+        system_prompt, prompt = self._build_analysis_prompt(image_paths, template_info)
         
         try:
             # 使用视觉模型分析图像
@@ -326,7 +326,8 @@ class PPTAnalysisAgent(BaseAgent):
                 model=self.vision_model,
                 prompt=prompt,
                 image_path=image_paths[0],  # 使用第一张图作为输入
-                max_retries=self.max_retries
+                max_retries=self.max_retries,
+                system_prompt=system_prompt
             )
             
             # 解析视觉模型响应
@@ -344,7 +345,7 @@ class PPTAnalysisAgent(BaseAgent):
             # 返回空结果
             return {"slideLayouts": [], "visualFeatures": {}, "recommendations": {}}
     
-    def _build_analysis_prompt(self, image_paths: List[str], template_info: Dict[str, Any]) -> str:
+    def _build_analysis_prompt(self, image_paths: List[str], template_info: Dict[str, Any]) -> Tuple[str, str]:
         """
         构建用于视觉分析的提示词
         
@@ -353,17 +354,23 @@ class PPTAnalysisAgent(BaseAgent):
             template_info: 模板信息
             
         Returns:
-            提示词
+            (系统提示词, 用户提示词)
         """
-        # 将template_info转换为JSON字符串
-        template_info_json = json.dumps(template_info, ensure_ascii=False, indent=2)
+        # 幻灯片结构数据只在"幻灯片JSON结构数据"一节中出现一次，模板信息一节只放其余字段，
+        # 避免同一批幻灯片JSON在prompt中序列化和发送两遍
+        slides = template_info.get("slides", [])
+        other_info = {key: value for key, value in template_info.items() if key != "slides"}
+        
+        # 转换为JSON字符串（保留中文，不经过Jinja的tojson转义）
+        template_info_json = dumps_prompt_json(other_info) if other_info else ""
         
         # 构建上下文
         context = {
             # 添加模板信息和图像相关的变量
-            "template_info": template_info,  # 添加模板信息对象
+            "template_info": other_info,  # 添加模板信息对象（不含slides）
             "has_images": len(image_paths) > 0,  # 添加是否有图像的标志
-            "image_indices": template_info.get("slides", []),  # 添加幻灯片JSON结构数据
+            "image_indices": slides,  # 添加幻灯片JSON结构数据
+            "image_indices_json": dumps_prompt_json(slides) if slides else "",
             "template_info_json": template_info_json,
             "image_count": len(image_paths),
             # 添加内容类型变量到上下文中
@@ -375,7 +382,7 @@ class PPTAnalysisAgent(BaseAgent):
         }
         
         # 使用新的yaml格式prompt
-        return self.prompt_loader.render_prompt("ppt_analyzer_prompts", context)
+        return self.prompt_loader.render_prompt_parts("ppt_analyzer_prompts", context)
     
     def _merge_batch_results(self, results: List[Dict[str, Any]], template_info: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -477,14 +484,15 @@ class PPTAnalysisAgent(BaseAgent):
             
             # 构建提示词
             template_info = {"slides": slides_json}
-            prompt = self._build_analysis_prompt([image_path], template_info)
+            system_prompt, prompt = self._build_analysis_prompt([image_path], template_info)
             
             # 使用视觉模型分析图像
             response = await self.model_helper.analyze_image_with_retry(
                 model=self.vision_model,
                 prompt=prompt,
                 image_path=image_path,
-                max_retries=self.max_retries
+                max_retries=self.max_retries,
+                system_prompt=system_prompt
             )
             
             # 解析视觉模型响应
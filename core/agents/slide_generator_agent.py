@@ -20,9 +20,9 @@ from core.agents.base_agent import BaseAgent
 from core.engine.state import AgentState
 from core.llm.model_manager import ModelManager
 from core.utils.model_helper import ModelHelper
-from core.utils.ppt_agent_helper import PPTAgentHelper, EnumEncoder
+from core.utils.ppt_agent_helper import PPTAgentHelper
 from core.utils.ppt_operations import PPTOperationExecutor
-from core.utils.prompt_loader import PromptLoader
+from core.utils.prompt_loader import PromptLoader, dumps_prompt_json
 from config.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -351,8 +351,8 @@ class SlideGeneratorAgent(BaseAgent):
             上下文字典
         """
         return {
-            "slide_elements_json": json.dumps(slide_elements, ensure_ascii=False, indent=2, cls=EnumEncoder),
-            "content_json": json.dumps(current_section, ensure_ascii=False, indent=2, cls=EnumEncoder)
+            "slide_elements_json": dumps_prompt_json(slide_elements),
+            "content_json": dumps_prompt_json(current_section)
         }
     
     async def _add_slide_id_to_notes(self, presentation: Any, slide_index: int, current_section: Dict[str, Any]) -> None:
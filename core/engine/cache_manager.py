@@ -13,8 +13,25 @@ import hashlib
 from core.engine.state import AgentState
 from config.settings import settings
 
+# orjson为可选依赖，安装后用于缓存文件的序列化
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 logger = logging.getLogger(__name__)
 
+
+def _write_json(path: Path, data: Any) -> None:
+    """将数据以带缩进的UTF-8 JSON写入文件，安装orjson时直接写入序列化后的bytes"""
+    if HAS_ORJSON:
+        path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        return
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
 class CacheManager:
     """缓存管理器，负责处理各种缓存数据"""
     
@@ -98,8 +115,7 @@ class CacheManager:
         cache_path = self.get_cache_path(cache_type, key)
         
         try:
-            with open(cache_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
+            _write_json(cache_path, data)
             
             logger.info(f"已保存缓存: {cache_type}/{key}")
             return cache_path
@@ -258,8 +274,7 @@ class CacheManager:
         cache_path = ppt_dir / f"{template_name}_analysis.json"
         
         try:
-            with open(cache_path, 'w', encoding='utf-8') as f:
-                json.dump(layout_features, f, ensure_ascii=False, indent=2)
+            _write_json(cache_path, layout_features)
             
             logger.info(f"已保存PPT分析缓存: {cache_path}")
             return cache_path
@@ -267,6 +282,47 @@ class CacheManager:
             logger.error(f"保存PPT分析缓存失败: {cache_path} - {str(e)}")
             raise
     
+    def compute_file_hash(self, file_path: str) -> str:
+        """
+        计算文件内容哈希，用作按内容复用分析结果的缓存键
+
+        Args:
+            file_path: 文件路径
+
+        Returns:
+            缓存键 (blake2b-128哈希值)
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def get_ppt_analysis_cache_by_hash(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """
+        按模板文件内容哈希获取PPT分析缓存
+
+        Args:
+            content_hash: compute_file_hash得到的内容哈希
+
+        Returns:
+            缓存的分析结果，如果不存在则返回None
+        """
+        return self.load_from_cache("ppt_analysis_by_hash", content_hash)
+
+    def save_ppt_analysis_cache_by_hash(self, content_hash: str, layout_features: Dict[str, Any]) -> Path:
+        """
+        按模板文件内容哈希保存PPT分析缓存
+
+        Args:
+            content_hash: compute_file_hash得到的内容哈希
+            layout_features: 分析出的布局特征
+
+        Returns:
+            缓存文件路径
+        """
+        return self.save_to_cache("ppt_analysis_by_hash", content_hash, layout_features)
+
     def get_content_plan_cache(self, content_structure: Dict[str, Any], layout_features: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """
         获取内容规划缓存
@@ -308,4 +364,16 @@ class CacheManager:
         cache_key = f"{title}_{template_name}"
         
         # 保存到缓存
-        return self.save_to_cache("content_plan", cache_key, content_plan) 
\ No newline at end of file
+        return self.save_to_cache("content_plan", cache_key, content_plan)
+
+
+# 进程内共享的默认CacheManager（使用默认缓存目录）
+_shared_cache_manager: Optional[CacheManager] = None
+
+
+def get_cache_manager() -> CacheManager:
+    """获取进程内共享的默认CacheManager，首次调用时创建"""
+    global _shared_cache_manager
+    if _shared_cache_manager is None:
+        _shared_cache_manager = CacheManager()
+    return _shared_cache_manager
@@ -3,6 +3,8 @@
 """
 import logging
 import traceback
+import asyncio
+import inspect
 import json
 import hashlib
 from typing import Dict, Any, Optional, TYPE_CHECKING
@@ -40,6 +42,9 @@ class NodeExecutor:
         
         # 初始化进度回调为None
         self.progress_callback = None
+        # 异步进度回调所在的事件循环及尚未完成的回调任务
+        self._progress_loop = None
+        self._pending_progress = set()
         
         logger.info("节点执行器初始化完成")
     
@@ -48,9 +53,14 @@ class NodeExecutor:
         设置进度回调函数
         
         Args:
-            callback: 回调函数，接受step, progress, description, preview_data参数
+            callback: 回调函数，接受step, progress, description, preview_data参数；
+                      可以是普通函数，也可以是async函数（调度到当前事件循环执行）
         """
         self.progress_callback = callback
+        try:
+            self._progress_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._progress_loop = None
         logger.debug("已设置进度回调函数")
     
     def report_progress(self, step: str, progress: int, description: str, preview_data: dict = None):
@@ -65,10 +75,49 @@ class NodeExecutor:
         """
         if self.progress_callback:
             try:
-                self.progress_callback(step, progress, description, preview_data)
+                result = self.progress_callback(step, progress, description, preview_data)
+                if inspect.isawaitable(result):
+                    self._schedule_progress(result)
             except Exception as e:
                 logger.error(f"调用进度回调函数失败: {str(e)}")
     
+    def _schedule_progress(self, coro) -> None:
+        """将异步进度回调调度到工作流事件循环上，不阻塞调用方"""
+        try:
+            running_loop = asyncio.get_running_loop()
+        except RuntimeError:
+            running_loop = None
+        
+        loop = self._progress_loop or running_loop
+        if loop is None:
+            # 没有工作流事件循环时丢弃本次进度：为每次进度新建事件循环会让绑定在循环上的
+            # 异步客户端和锁随之失效
+            if inspect.iscoroutine(coro):
+                coro.close()
+            logger.warning("没有可用的工作流事件循环，丢弃本次异步进度回调")
+        elif loop is running_loop:
+            self._track_progress_task(coro)
+        else:
+            # 从其他线程调用（如asyncio.to_thread中的节点），转交给工作流事件循环
+            loop.call_soon_threadsafe(self._track_progress_task, coro)
+    
+    def _track_progress_task(self, coro) -> None:
+        """创建进度回调任务并保留引用，直到任务结束"""
+        task = asyncio.ensure_future(coro)
+        self._pending_progress.add(task)
+        task.add_done_callback(self._on_progress_done)
+    
+    def _on_progress_done(self, task) -> None:
+        """进度回调任务结束后移除引用并记录异常"""
+        self._pending_progress.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(f"调用进度回调函数失败: {str(task.exception())}")
+    
+    async def flush_progress(self) -> None:
+        """等待所有已调度的异步进度回调完成"""
+        if self._pending_progress:
+            await asyncio.gather(*list(self._pending_progress), return_exceptions=True)
+    
     async def _execute_node(self, node_name: str, state: AgentState, use_mock: bool = False) -> None:
         """
         执行节点
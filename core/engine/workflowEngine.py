@@ -259,3 +259,6 @@ class WorkflowEngine:
                 minimal_state.save()
                 if self.enable_tracking and self.tracker: self.tracker.end_workflow_run("FAILED")
                 return minimal_state
+        finally:
+            # 确保异步进度回调在事件循环关闭前全部完成
+            await self.node_executor.flush_progress()
@@ -30,6 +30,35 @@ logger = logging.getLogger(__name__)
 # 全局实例注册表，用于跟踪所有ModelManager实例
 _model_manager_instances = weakref.WeakSet()
 
+# 按API配置共享的AsyncOpenAI客户端。客户端的连接池绑定在创建它的事件循环上，
+# worker进程复用同一个事件循环，因此各任务的ModelManager可以复用同一组HTTP连接
+_shared_clients: Dict[tuple, AsyncOpenAI] = {}
+_shared_clients_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_shared_client(api_key: str, api_base: str, organization: str) -> AsyncOpenAI:
+    """获取当前事件循环上共享的AsyncOpenAI客户端，事件循环变化时重新创建"""
+    global _shared_clients_loop
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # 不在事件循环内，无法确定连接池归属，不共享
+        return AsyncOpenAI(api_key=api_key, base_url=api_base, organization=organization)
+    
+    if _shared_clients_loop is not loop:
+        _shared_clients.clear()
+        _shared_clients_loop = loop
+    
+    key = (api_key, api_base, organization)
+    client = _shared_clients.get(key)
+    if client is None:
+        client = _shared_clients[key] = AsyncOpenAI(
+            api_key=api_key,
+            base_url=api_base,
+            organization=organization
+        )
+    return client
+
 class ModelManager:
     """OpenAI API简化封装"""
     
@@ -242,12 +271,8 @@ class ModelManager:
         if not api_key or api_key.strip() == "":
             raise ValueError(f"模型类型 {model_type} 的API密钥未配置或为空")
             
-        # 创建客户端
-        client = AsyncOpenAI(
-            api_key=api_key,
-            base_url=api_base,
-            organization=self.organization
-        )
+        # 获取共享客户端（同一事件循环上相同配置的ModelManager复用连接池）
+        client = _get_shared_client(api_key, api_base, self.organization)
         
         # 缓存客户端
         self._clients[model_type] = client
@@ -262,7 +287,11 @@ class ModelManager:
             return
             
         logger.debug("开始关闭异步客户端连接")
+        shared_ids = {id(client) for client in _shared_clients.values()}
         for model_type, client in list(self._clients.items()):
+            # 共享客户端由其他任务继续使用，只释放引用
+            if id(client) in shared_ids:
+                continue
             try:
                 await client.close()
                 logger.debug(f"已关闭 {model_type} 客户端")
@@ -430,7 +459,8 @@ class ModelManager:
             logger.error(f"调用OpenAI嵌入API失败: {str(e)}")
             raise
     
-    async def analyze_image(self, model: str, image_path: str, prompt: str) -> str:
+    async def analyze_image(self, model: str, image_path: str, prompt: str,
+                            system_prompt: Optional[str] = None) -> str:
         """
         分析图像内容
         
@@ -438,6 +468,7 @@ class ModelManager:
             model: 模型名称
             image_path: 图像文件路径
             prompt: 分析提示词
+            system_prompt: 系统提示词，提供时作为独立的system消息放在图像消息之前
             
         Returns:
             分析结果
@@ -470,15 +501,20 @@ class ModelManager:
                 }
             ]
             
+            messages = [
+                {
+                    "role": "user",
+                    "content": content
+                }
+            ]
+            # 固定的system消息在前，便于服务端复用相同前缀的缓存
+            if system_prompt:
+                messages.insert(0, {"role": "system", "content": system_prompt})
+            
             # 调用OpenAI API
             response = await client.chat.completions.create(
                 model=model,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": content
-                    }
-                ],
+                messages=messages,
                 max_tokens=4000
             )
             
@@ -12,6 +12,8 @@ import json
 import logging
 import mlflow
 import mlflow.openai  # 导入OpenAI集成
+from mlflow.entities import Metric, Param
+from mlflow.tracking import MlflowClient
 from datetime import datetime
 from typing import Dict, Any, List, Optional, Callable
 from pathlib import Path
@@ -35,11 +37,18 @@ class MLflowTracker:
         self.tracking_uri = tracking_uri or os.environ.get("MLFLOW_TRACKING_URI", "http://127.0.0.1:5001")
         self.experiment_name = experiment_name
         self.active_run = None
+        self.run_id = None
         
         # 设置MLflow跟踪URI
         mlflow.set_tracking_uri(self.tracking_uri)
-        mlflow.set_experiment(experiment_name)
-        
+        self.experiment_id = mlflow.set_experiment(experiment_name).experiment_id
+
+        # 启用异步记录（MLflow 2.16+）：log_*调用由MLflow后台线程通过同一个keep-alive会话发送，
+        # 调用方不再逐次等待HTTP响应；end_run时会自动等待未完成的记录
+        enable_async_logging = getattr(getattr(mlflow, "config", None), "enable_async_logging", None)
+        if enable_async_logging:
+            enable_async_logging(True)
+
         # 启用OpenAI自动跟踪
         mlflow.openai.autolog()
         
@@ -63,15 +72,65 @@ class MLflowTracker:
         }
         
         self.active_run = mlflow.start_run(run_name=f"workflow_{int(time.time())}", tags=tags)
+        self.run_id = self.active_run.info.run_id
         self.start_time = time.time()
         
         # 记录工作流开始
-        mlflow.log_param("workflow_start_time", self.start_time)
-        mlflow.log_param("workflow_name", workflow_name)
+        mlflow.log_params({
+            "workflow_start_time": self.start_time,
+            "workflow_name": workflow_name
+        })
         
         logger.info(f"工作流运行已开始: {self.active_run.info.run_id}")
         return self.active_run
     
+    def create_workflow_run(self, session_id=None, workflow_name=None):
+        """通过客户端创建工作流运行，不激活到当前线程
+        
+        只发送网络请求，不改变MLflow按线程隔离的活动运行栈，可以在后台线程中调用。
+        在执行工作流的线程上调用activate_run后，OpenAI自动跟踪等记录才会关联到该运行。
+        
+        Args:
+            session_id: 会话ID
+            workflow_name: 工作流名称
+        """
+        # 结束之前的运行（如果有）
+        if self.active_run:
+            self.end_workflow_run("FINISHED")
+        
+        tags = {
+            "session_id": session_id or "unknown",
+            "workflow_name": workflow_name or "unknown"
+        }
+        
+        client = MlflowClient(tracking_uri=self.tracking_uri)
+        self.active_run = client.create_run(self.experiment_id, tags=tags, run_name=f"workflow_{int(time.time())}")
+        self.run_id = self.active_run.info.run_id
+        self.start_time = time.time()
+        
+        # 记录工作流开始
+        client.log_batch(self.run_id, params=[
+            Param("workflow_start_time", str(self.start_time)),
+            Param("workflow_name", str(workflow_name))
+        ])
+        
+        logger.info(f"工作流运行已创建: {self.run_id}")
+        return self.active_run
+    
+    def activate_run(self):
+        """在当前线程上激活已创建的运行，此后该线程上的MLflow记录和自动跟踪写入该运行"""
+        if not self.run_id:
+            return None
+        current = mlflow.active_run()
+        if current and current.info.run_id == self.run_id:
+            return current
+        if current:
+            # 线程被复用时可能遗留上一次未结束的运行，激活前先结束它
+            logger.warning(f"结束当前线程上遗留的MLflow运行: {current.info.run_id}")
+            mlflow.end_run()
+        self.active_run = mlflow.start_run(run_id=self.run_id)
+        return self.active_run
+    
     def end_workflow_run(self, status="FINISHED"):
         """结束工作流运行
         
@@ -87,9 +146,6 @@ class MLflowTracker:
         end_time = time.time()
         duration = end_time - self.start_time
         
-        mlflow.log_param("workflow_end_time", end_time)
-        mlflow.log_metric("workflow_duration", duration)
-        
         # 状态映射，确保使用MLflow支持的状态值
         status_map = {
             "completed": "FINISHED",
@@ -109,12 +165,22 @@ class MLflowTracker:
             logger.warning(f"不支持的MLflow状态值: {status}，将使用FINISHED")
             mlflow_status = "FINISHED"
         
-        mlflow.log_param("workflow_status", status)  # 记录原始状态
+        # 结束时间、原始状态和运行时长通过一次请求写入
+        MlflowClient(tracking_uri=self.tracking_uri).log_batch(
+            self.run_id,
+            metrics=[Metric("workflow_duration", duration, int(end_time * 1000), 0)],
+            params=[Param("workflow_end_time", str(end_time)), Param("workflow_status", status)]
+        )
         
-        # 结束运行
-        mlflow.end_run(status=mlflow_status)
+        # 结束运行；MLflow的活动运行栈按线程隔离，运行在其他线程中创建时通过客户端结束
+        active_run = mlflow.active_run()
+        if active_run and active_run.info.run_id == self.run_id:
+            mlflow.end_run(status=mlflow_status)
+        else:
+            MlflowClient(tracking_uri=self.tracking_uri).set_terminated(self.run_id, mlflow_status)
         logger.info(f"工作流运行已结束: 状态={status}, MLflow状态={mlflow_status}, 持续时间={duration:.2f}秒")
         self.active_run = None
+        self.run_id = None
     
     def log_node_execution(self, node_name, node_type, inputs, outputs, state_before, state_after, artifacts=None):
         """记录节点执行
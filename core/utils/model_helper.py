@@ -10,15 +10,30 @@
 import logging
 import json
 import re
+import random
 import asyncio
 from typing import Dict, Any, Optional, List, Tuple, Callable, Union
 
+from openai import AuthenticationError, BadRequestError, NotFoundError, PermissionDeniedError
+
 from config.settings import settings
 from core.llm.model_manager import ModelManager
 
 # 初始化日志
 logger = logging.getLogger(__name__)
 
+# 重试无法恢复的错误（密钥、权限、模型不存在、请求本身无效），遇到时不再重试
+_NON_RETRYABLE_ERRORS = (AuthenticationError, BadRequestError, NotFoundError, PermissionDeniedError)
+
+# 重试退避上限（秒）
+_RETRY_BACKOFF_MAX = 10
+
+
+def _retry_delay(retry_count: int) -> float:
+    """第retry_count次重试前的等待时间：指数退避加随机抖动，避免并发任务同时重试"""
+    backoff = min(2 ** retry_count, _RETRY_BACKOFF_MAX)
+    return backoff / 2 + random.uniform(0, backoff / 2)
+
 class ModelHelper:
     """
     模型调用辅助工具类
@@ -99,7 +114,8 @@ class ModelHelper:
                                      max_retries: int = 3,
                                      model_type: str = "text",
                                      custom_api_key: Optional[str] = None,
-                                     custom_api_base: Optional[str] = None) -> str:
+                                     custom_api_base: Optional[str] = None,
+                                     system_prompt: Optional[str] = None) -> str:
         """
         使用重试机制生成文本
         
@@ -112,10 +128,16 @@ class ModelHelper:
             model_type: 模型类型，用于选择正确的客户端
             custom_api_key: 自定义API密钥
             custom_api_base: 自定义API基础URL
+            system_prompt: 系统提示词，提供时作为独立的system消息放在prompt之前
             
         Returns:
             生成的文本
         """
+        # 创建消息：固定的system消息在前，便于服务端复用相同前缀的缓存
+        messages = [{"role": "user", "content": prompt}]
+        if system_prompt:
+            messages.insert(0, {"role": "system", "content": system_prompt})
+        
         retry_count = 0
         last_error = None
         
@@ -142,9 +164,6 @@ class ModelHelper:
                     else:
                         client = self.model_manager._get_client("text")
                 
-                # 创建消息
-                messages = [{"role": "user", "content": prompt}]
-                
                 # 调用OpenAI API
                 response = await client.chat.completions.create(
                     model=model,
@@ -174,17 +193,22 @@ class ModelHelper:
                     except:
                         pass
                 
+                # 不可恢复的错误直接失败
+                if isinstance(e, _NON_RETRYABLE_ERRORS):
+                    break
+                
                 # 在重试之间添加短暂延迟
                 if retry_count <= max_retries:
-                    await asyncio.sleep(min(2 ** retry_count, 10))  # 指数退避，最大10秒
+                    await asyncio.sleep(_retry_delay(retry_count))
         
         # 如果所有重试都失败，抛出最后一个异常
-        error_msg = f"调用模型 {model} 生成文本失败，已重试 {max_retries} 次: {str(last_error)}"
+        error_msg = f"调用模型 {model} 生成文本失败，共尝试 {retry_count} 次: {str(last_error)}"
         logger.error(error_msg)
         raise RuntimeError(error_msg)
     
     async def analyze_image_with_retry(self, model: str, prompt: str, image_path: str,
-                                     max_retries: int = 3) -> str:
+                                     max_retries: int = 3,
+                                     system_prompt: Optional[str] = None) -> str:
         """
         使用重试机制分析图像
         
@@ -193,6 +217,7 @@ class ModelHelper:
             prompt: 提示词
             image_path: 图像路径
             max_retries: 最大重试次数
+            system_prompt: 系统提示词，提供时作为独立的system消息发送
             
         Returns:
             分析结果文本
@@ -208,7 +233,8 @@ class ModelHelper:
                 response = await self.model_manager.analyze_image(
                     model=model,
                     prompt=prompt,
-                    image_path=image_path
+                    image_path=image_path,
+                    system_prompt=system_prompt
                 )
                 
                 return response
@@ -218,12 +244,16 @@ class ModelHelper:
                 logger.warning(f"使用模型 {model} 分析图像时出错 (尝试 {retry_count+1}/{max_retries+1}): {str(e)}")
                 retry_count += 1
                 
+                # 不可恢复的错误直接失败
+                if isinstance(e, _NON_RETRYABLE_ERRORS):
+                    break
+                
                 # 在重试之间添加短暂延迟
                 if retry_count <= max_retries:
-                    await asyncio.sleep(min(2 ** retry_count, 10))  # 指数退避，最大10秒
+                    await asyncio.sleep(_retry_delay(retry_count))
         
         # 如果所有重试都失败，抛出最后一个异常
-        error_msg = f"使用模型 {model} 分析图像失败，已重试 {max_retries} 次: {str(last_error)}"
+        error_msg = f"使用模型 {model} 分析图像失败，共尝试 {retry_count} 次: {str(last_error)}"
         logger.error(error_msg)
         raise RuntimeError(error_msg)
     
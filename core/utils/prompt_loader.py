@@ -8,23 +8,63 @@ Prompt加载器模块
 """
 
 import os
+import json
+import enum
 import yaml
 import logging
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, Any, Optional, List
-from jinja2 import Template
+from typing import Dict, Any, Optional, List, Tuple
+from jinja2 import Environment, Template
 
 from config.settings import settings
 
+# orjson为可选依赖，安装后用于序列化填入prompt的JSON数据
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
 logger = logging.getLogger(__name__)
 
+# 所有PromptLoader实例共享的Jinja环境；块标签（{% if %}等）独占一行，trim_blocks/lstrip_blocks去掉标签所在行留下的空行
+_JINJA_ENV = Environment(autoescape=False, trim_blocks=True, lstrip_blocks=True)
+
+# 所有PromptLoader实例共享的prompt配置缓存，每个YAML文件在进程内只解析一次
+_PROMPT_CACHE: Dict[str, Dict[str, Any]] = {}
+
+
+@lru_cache(maxsize=64)
+def _compile_template(source: str) -> Template:
+    """编译prompt模板，相同的模板文本在进程内只解析和编译一次"""
+    return _JINJA_ENV.from_string(source)
+
+
+def _json_default(obj: Any) -> Any:
+    """json回退路径下序列化枚举值（orjson原生支持枚举）"""
+    if isinstance(obj, enum.Enum):
+        return obj.value
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_prompt_json(data: Any) -> str:
+    """将数据序列化为填入prompt的带缩进JSON文本（保留中文，枚举输出其值）
+    
+    安装orjson时使用orjson，输出格式与json.dumps(ensure_ascii=False, indent=2)一致。
+    """
+    if HAS_ORJSON:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(data, ensure_ascii=False, indent=2, default=_json_default)
+
+
 class PromptLoader:
     """Prompt加载器，用于加载和渲染YAML格式的prompt文件"""
     
     def __init__(self):
         """初始化prompt加载器"""
         self.prompts_dir = settings.CONFIG_DIR / "prompts"
-        self._cache = {}  # 缓存已加载的prompt
+        self._cache = _PROMPT_CACHE  # 缓存已加载的prompt（各实例共享）
         
     def load_prompt(self, prompt_name: str) -> Dict[str, Any]:
         """
@@ -53,6 +93,11 @@ class PromptLoader:
             # 验证必需字段
             self._validate_prompt_config(prompt_config, prompt_name)
             
+            # 加载时即编译模板，渲染时直接复用，模板语法错误也在加载时暴露
+            _compile_template(prompt_config['template'])
+            if prompt_config.get('system_prompt'):
+                _compile_template(prompt_config['system_prompt'])
+            
             # 缓存结果
             self._cache[prompt_name] = prompt_config
             
@@ -92,6 +137,27 @@ class PromptLoader:
         Returns:
             渲染后的prompt文本
         """
+        system_prompt, rendered_template = self.render_prompt_parts(prompt_name, context)
+        
+        # 如果有system_prompt，将其与template合并
+        if system_prompt:
+            return f"{system_prompt}\n\n{rendered_template}"
+        return rendered_template
+    
+    def render_prompt_parts(self, prompt_name: str, context: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        分别返回渲染后的system_prompt和模板，供以system/user两条消息发送
+        
+        system_prompt与模板使用同一上下文渲染，但只应引用进程内不变的常量（如内容类型定义），
+        保证其内容固定，可作为LLM服务端前缀缓存的公共前缀。
+        
+        Args:
+            prompt_name: prompt名称
+            context: 模板上下文变量
+            
+        Returns:
+            (渲染后的system_prompt, 渲染后的模板文本)，未配置system_prompt时前者为空字符串
+        """
         prompt_config = self.load_prompt(prompt_name)
         
         # 检查必需的jinja参数
@@ -102,20 +168,14 @@ class PromptLoader:
             logger.warning(f"Prompt {prompt_name} 缺少参数: {missing_args}")
         
         try:
-            # 获取system_prompt（如果有）
+            # 渲染system_prompt（如果有）
             system_prompt = prompt_config.get('system_prompt', '')
-            
-            # 渲染模板
-            template = Template(prompt_config['template'])
-            rendered_template = template.render(**context)
-            
-            # 如果有system_prompt，将其与template合并
             if system_prompt:
-                full_prompt = f"{system_prompt}\n\n{rendered_template}"
-            else:
-                full_prompt = rendered_template
-                
-            return full_prompt
+                system_prompt = _compile_template(system_prompt).render(**context)
+            
+            # 渲染模板（使用已编译的模板）
+            template = _compile_template(prompt_config['template'])
+            return system_prompt, template.render(**context)
             
         except Exception as e:
             logger.error(f"渲染prompt模板失败: {prompt_name}, 错误: {str(e)}")
@@ -136,6 +196,7 @@ class PromptLoader:
     def clear_cache(self) -> None:
         """清空prompt缓存"""
         self._cache.clear()
+        _compile_template.cache_clear()
         logger.info("已清空prompt缓存")
     
     def list_available_prompts(self) -> List[str]:
@@ -17,7 +17,7 @@ from typing import Dict, Any, List, Optional, Tuple
 
 from core.utils.ppt_agent_helper import PPTAgentHelper, EnumEncoder
 from core.utils.model_helper import ModelHelper
-from core.utils.prompt_loader import PromptLoader
+from core.utils.prompt_loader import PromptLoader, dumps_prompt_json
 
 logger = logging.getLogger(__name__)
 
@@ -688,8 +688,8 @@ class SlideValidationManager:
         """
         # 准备上下文数据
         context = {
-            "section_json": json.dumps(section_content, ensure_ascii=False, indent=2, cls=EnumEncoder),
-            "slide_elements_json": json.dumps(slide_elements, ensure_ascii=False, indent=2, cls=EnumEncoder)
+            "section_json": dumps_prompt_json(section_content),
+            "slide_elements_json": dumps_prompt_json(slide_elements)
         }
         
         # 使用新的yaml格式prompt
@@ -0,0 +1,39 @@
+"""
+模板分析任务的MLflow后台写入测试
+
+后台写入线程可能在跟踪器设置跟踪URI之前启动，写入操作必须发送到创建运行的跟踪服务器。
+"""
+from unittest import mock
+
+import pytest
+
+pytest.importorskip("mlflow")
+pytest.importorskip("celery")
+
+from apps.api.tasks import template_analysis
+
+
+def test_writer_started_before_tracker_uses_run_tracking_uri():
+    """写入线程先于跟踪器启动时，客户端仍使用运行所在的跟踪URI"""
+    tracking_uri = "http://mlflow.test:5001"
+
+    with mock.patch.object(template_analysis, "MlflowClient") as client_cls:
+        # 模拟worker启动：写入线程在任何跟踪URI设置之前已经运行
+        template_analysis._ensure_mlflow_writer()
+
+        # 跟踪器随后创建运行，批量记录器获得运行的跟踪URI和run_id
+        batch = template_analysis._MLflowBatchLogger()
+        batch.tracking_uri = tracking_uri
+        batch.run_id = "run-1"
+        batch.log_metric("step_progress", 50, step=50)
+        batch.log_json({"slides": []}, "analysis_summary/full.json")
+        batch.flush(final=True)
+        template_analysis._wait_mlflow_queue(timeout=5.0)
+
+    client_cls.assert_called_once_with(tracking_uri=tracking_uri)
+    client = client_cls.return_value
+    client.log_batch.assert_called_once()
+    assert client.log_batch.call_args.args[0] == "run-1"
+    client.log_text.assert_called_once()
+    assert client.log_text.call_args.args[0] == "run-1"
+    assert client.log_text.call_args.args[2] == "analysis_summary/full.json"